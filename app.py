@@ -1,15 +1,75 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import (Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify, g,
+                   make_response, before_render_template, template_rendered)
 from functools import wraps
 import json
+import time
 from database import Database
 from wiremock_service import WireMockService
+from sync_worker import SyncWorker
+from mock_engine import MockEngine
+from exporter import StubExporter
+from health import HealthMonitor
 from config import Config
+import metrics
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
 db = Database()
 wiremock = WireMockService()
+# Compiled stubs are checked against the mapping's version, so other processes' changes need no notice
+db.add_mapping_listener(wiremock.invalidate_stubs, remote=False)
+
+# Mapping changes are written to an outbox and pushed to WireMock in the background
+sync_worker = SyncWorker(db, wiremock)
+if Config.SYNC_WORKER_ENABLED:
+    sync_worker.start()
+
+# WireMock health is probed in the background; pages only read the cached result
+health_monitor = HealthMonitor(wiremock)
+if Config.HEALTH_CHECK_INTERVAL:
+    health_monitor.start()
+
+# Optional built-in serving of mock traffic, for running without a WireMock JVM
+mock_engine = MockEngine(db) if Config.MOCK_ENGINE_ENABLED else None
+
+# Optional on-disk copy of the stubs, so WireMock boots with them already loaded.
+# Workers only refresh changed files; the full rebuild runs once at server start.
+stub_exporter = StubExporter(db, wiremock, Config.WIREMOCK_EXPORT_DIR) if Config.WIREMOCK_EXPORT_DIR else None
+
+# Gauges read at scrape time, so they cost nothing between scrapes
+metrics.REGISTRY.gauge('mockpoc_active_mappings', 'Active mock mappings', function=db.count_active_mappings)
+metrics.REGISTRY.gauge('mockpoc_sync_outbox_depth', 'Mapping changes waiting to be pushed to WireMock',
+                       function=lambda: db.get_sync_outbox_stats()['depth'])
+for cache_name, cache_stats in (('user', db.get_user_cache_stats), ('stub', wiremock.stub_cache_stats)):
+    for field in ('hits', 'misses'):
+        metrics.REGISTRY.gauge(f'mockpoc_{cache_name}_cache_{field}', f'Lookups in the {cache_name} cache: {field}',
+                               function=lambda stats=cache_stats, field=field: stats()[field])
+
+@app.before_request
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    started_at = g.pop('request_started_at', None)
+    if started_at is not None:
+        metrics.HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started_at,
+            endpoint=request.endpoint or 'unmatched', method=request.method, status=str(response.status_code)
+        )
+    return response
+
+def start_template_timer(sender, template, context, **extra):
+    g.setdefault('template_started_at', {})[template.name] = time.perf_counter()
+
+def record_template_duration(sender, template, context, **extra):
+    started_at = g.get('template_started_at', {}).pop(template.name, None)
+    if started_at is not None:
+        metrics.TEMPLATE_RENDER_DURATION.observe(time.perf_counter() - started_at, template=template.name)
+
+before_render_template.connect(start_template_timer, app)
+template_rendered.connect(record_template_duration, app)
 
 # Authentication decorator
 def login_required(f):
@@ -30,12 +90,116 @@ def admin_required(f):
             return redirect(url_for('login'))
         
         user = db.get_user_by_id(session['user_id'])
-        if not user or not user['is_admin']:
+        if not user or not user['is_admin'] or not user['is_active']:
             flash('You do not have permission to access this page.', 'error')
             return redirect(url_for('index'))
         return f(*args, **kwargs)
     return decorated_function
 
+# Listing helpers: keyset cursors travel in the query string as "<created_at>|<id>"
+def encode_cursor(after):
+    return f'{after[0]}|{after[1]}' if after else None
+
+def decode_cursor(value):
+    try:
+        created_at, row_id = value.rsplit('|', 1)
+        return created_at, int(row_id)
+    except (AttributeError, ValueError):
+        return None
+
+def flag_filter(value, true_value, false_value):
+    return {true_value: True, false_value: False}.get(value)
+
+def status_code_filter(value):
+    return int(value) if value and value.isdigit() else None
+
+# Mapping records as used by JSONL import and export
+def validate_headers(headers):
+    """Check response headers once at write time, so syncs can trust them; raises ValueError"""
+    if isinstance(headers, str):
+        headers = json.loads(headers)
+    if not isinstance(headers, dict):
+        raise ValueError('response_headers must be a JSON object')
+    for name, value in headers.items():
+        values = value if isinstance(value, list) else [value]
+        if not all(isinstance(v, str) for v in values):
+            raise ValueError(f'header "{name}" must be a string or a list of strings')
+    return headers
+
+def mapping_from_record(record):
+    """Validate an imported mapping record; raises ValueError describing the problem"""
+    if not isinstance(record, dict):
+        raise ValueError('expected a JSON object')
+    missing = [field for field in ('name', 'request_method', 'request_url') if not record.get(field)]
+    if missing:
+        raise ValueError(f'missing {", ".join(missing)}')
+    
+    headers = validate_headers(record.get('response_headers') or {})
+    
+    body = record.get('response_body') or ''
+    if not isinstance(body, str):
+        body = json.dumps(body)
+    
+    return {
+        'name': str(record['name']),
+        'request_method': str(record['request_method']).upper(),
+        'request_url': str(record['request_url']),
+        'response_status': int(record.get('response_status', 200)),
+        'response_body': body,
+        'response_headers': json.dumps(headers),
+        'priority': int(record.get('priority', 5)),
+        'is_active': bool(record.get('is_active', True))
+    }
+
+def mapping_updates_from_record(record):
+    """Validate a partial update record from the API; raises ValueError describing the problem"""
+    if not isinstance(record, dict):
+        raise ValueError('expected a JSON object')
+    try:
+        updates = {'id': int(record['id'])}
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('missing or invalid id')
+    
+    for field in ('name', 'request_url'):
+        if field in record:
+            if not record[field]:
+                raise ValueError(f'{field} cannot be empty')
+            updates[field] = str(record[field])
+    if 'request_method' in record:
+        if not record['request_method']:
+            raise ValueError('request_method cannot be empty')
+        updates['request_method'] = str(record['request_method']).upper()
+    for field in ('response_status', 'priority'):
+        if field in record:
+            updates[field] = int(record[field])
+    if 'response_body' in record:
+        body = record['response_body'] or ''
+        updates['response_body'] = body if isinstance(body, str) else json.dumps(body)
+    if 'response_headers' in record:
+        updates['response_headers'] = json.dumps(validate_headers(record['response_headers'] or {}))
+    if 'is_active' in record:
+        updates['is_active'] = 1 if record['is_active'] else 0
+    
+    if len(updates) == 1:
+        raise ValueError('nothing to update')
+    return updates
+
+def mapping_to_record(mapping):
+    try:
+        headers = json.loads(mapping['response_headers'] or '{}')
+    except ValueError:
+        headers = {}
+    return {
+        'name': mapping['name'],
+        'request_method': mapping['request_method'],
+        'request_url': mapping['request_url'],
+        'response_status': mapping['response_status'],
+        'response_body': mapping['response_body'],
+        'response_headers': headers,
+        'priority': mapping['priority'],
+        'is_active': bool(mapping['is_active'])
+    }
+
 @app.route('/')
 def index():
     if 'user_id' in session:
@@ -74,9 +238,41 @@ def logout():
 @app.route('/admin')
 @admin_required
 def admin_dashboard():
-    users = db.get_all_users()
-    wiremock_status = wiremock.test_connection()
-    return render_template('admin/dashboard.html', users=users, wiremock_status=wiremock_status)
+    filters = {
+        'sort': request.args.get('sort', 'newest'),
+        'role': request.args.get('role', ''),
+        'status': request.args.get('status', '')
+    }
+    users, next_after = db.get_users_page(
+        Config.PAGE_SIZE,
+        after=decode_cursor(request.args.get('after')),
+        newest_first=filters['sort'] != 'oldest',
+        is_admin=flag_filter(filters['role'], 'admin', 'user'),
+        is_active=flag_filter(filters['status'], 'active', 'inactive')
+    )
+    wiremock_nodes = health_monitor.node_health()
+    wiremock_status = all(node['online'] for node in wiremock_nodes)
+    sync_stats = sync_worker.stats()
+    
+    # Mapping search across all users; the form only sends these when used
+    search = {
+        'q': request.args.get('q', ''),
+        'method': request.args.get('method', ''),
+        'code': request.args.get('code', ''),
+        'active': request.args.get('active', '')
+    }
+    search_results = None
+    if any(search.values()):
+        search_results = db.search_mappings(
+            search['q'], request_method=search['method'] or None,
+            response_status=status_code_filter(search['code']),
+            is_active=flag_filter(search['active'], 'active', 'inactive'), limit=Config.PAGE_SIZE
+        )
+    return render_template('admin/dashboard.html', users=users, wiremock_status=wiremock_status,
+                           wiremock_nodes=wiremock_nodes, sync_stats=sync_stats, filters=filters,
+                           search=search, search_results=search_results,
+                           next_cursor=encode_cursor(next_after),
+                           paged='after' in request.args)
 
 @app.route('/admin/users/create', methods=['POST'])
 @admin_required
@@ -138,21 +334,70 @@ def admin_delete_user(user_id):
 @app.route('/admin/sync-wiremock', methods=['POST'])
 @admin_required
 def admin_sync_wiremock():
-    mappings = db.get_all_active_mappings()
-    results = wiremock.sync_all_mappings(mappings)
+    results = sync_worker.full_sync()
+    if results is None:
+        flash(f'Sync did not run: {sync_worker.last_error}. Try again shortly.', 'error')
+        return redirect(url_for('admin_dashboard'))
     
     success_count = sum(1 for r in results if r['success'])
     flash(f'Synced {success_count} of {len(results)} mappings to WireMock.', 'success')
     
     return redirect(url_for('admin_dashboard'))
 
+@app.route('/admin/reconcile-wiremock', methods=['POST'])
+@admin_required
+def admin_reconcile_wiremock():
+    flash_reconcile_report(sync_worker.reconcile())
+    return redirect(url_for('admin_dashboard'))
+
+def flash_reconcile_report(report):
+    if report['error'] and not report['drift']:
+        flash(f'Drift check failed: {report["error"]}', 'error')
+    elif not report['drift']:
+        flash('WireMock matches the database; no drift found.', 'success')
+    elif report['failed']:
+        flash(f'Found {report["drift"]} drifted stubs, repaired {report["repaired"]}, '
+              f'{report["failed"]} failed: {report["error"]}', 'warning')
+    else:
+        flash(f'Found {report["drift"]} drifted stubs ({report["missing"]} missing, '
+              f'{report["stale"]} stale, {report["orphaned"]} orphaned) and repaired them.', 'success')
+
 # User Routes
 @app.route('/user')
 @login_required
 def user_dashboard():
     user_id = session['user_id']
-    mappings = db.get_user_mappings(user_id)
-    return render_template('user/dashboard.html', mappings=mappings)
+    filters = {
+        'sort': request.args.get('sort', 'newest'),
+        'method': request.args.get('method', ''),
+        'status': request.args.get('status', ''),
+        'q': request.args.get('q', ''),
+        'code': request.args.get('code', '')
+    }
+    if filters['q'] or filters['code']:
+        # Search results are the best matches only, so they are not paged
+        mappings, next_after = db.search_mappings(
+            filters['q'], user_id=user_id,
+            request_method=filters['method'] or None,
+            response_status=status_code_filter(filters['code']),
+            is_active=flag_filter(filters['status'], 'active', 'inactive'),
+            limit=Config.PAGE_SIZE
+        ), None
+    else:
+        # List views only load summary columns; bodies are read on the edit page
+        mappings, next_after = db.get_user_mappings_page(
+            user_id, Config.PAGE_SIZE,
+            after=decode_cursor(request.args.get('after')),
+            newest_first=filters['sort'] != 'oldest',
+            request_method=filters['method'] or None,
+            is_active=flag_filter(filters['status'], 'active', 'inactive')
+        )
+    # Hit counters come from the aggregated journal buckets, one indexed range per mapping
+    hits = db.get_mapping_hit_totals(mapping['id'] for mapping in mappings)
+    return render_template('user/dashboard.html', mappings=mappings, filters=filters, hits=hits,
+                           api_tokens=db.get_api_tokens(user_id),
+                           next_cursor=encode_cursor(next_after),
+                           paged='after' in request.args)
 
 @app.route('/user/mappings/create', methods=['GET', 'POST'])
 @login_required
@@ -169,10 +414,10 @@ def user_create_mapping():
         headers_input = request.form.get('response_headers', '').strip()
         if headers_input:
             try:
-                json.loads(headers_input)
+                validate_headers(headers_input)
                 response_headers = headers_input
-            except:
-                flash('Invalid JSON format for response headers.', 'error')
+            except ValueError as e:
+                flash(f'Invalid response headers: {str(e)}', 'error')
                 return render_template('user/create_mapping.html')
         
         priority = int(request.form.get('priority', 5))
@@ -182,26 +427,84 @@ def user_create_mapping():
             return render_template('user/create_mapping.html')
         
         try:
-            mapping_id = db.create_mapping(
+            db.create_mapping(
                 session['user_id'], name, request_method, request_url,
                 response_status, response_body, response_headers, priority
             )
+            sync_worker.notify()
             
-            # Sync to WireMock
-            mapping = db.get_mapping_by_id(mapping_id)
-            success, result = wiremock.sync_mapping(mapping)
-            
-            if success:
-                flash(f'Mapping "{name}" created and synced to WireMock.', 'success')
-            else:
-                flash(f'Mapping created but sync failed: {result}', 'warning')
-            
+            flash(f'Mapping "{name}" created and queued for sync to WireMock.', 'success')
             return redirect(url_for('user_dashboard'))
         except Exception as e:
             flash(f'Error creating mapping: {str(e)}', 'error')
     
     return render_template('user/create_mapping.html')
 
+@app.route('/user/resync-wiremock', methods=['POST'])
+@login_required
+def user_resync_wiremock():
+    # Compares and repairs only this user's stubs; other users' stubs are left alone
+    flash_reconcile_report(sync_worker.reconcile(user_id=session['user_id']))
+    return redirect(url_for('user_dashboard'))
+
+@app.route('/user/mappings/export')
+@login_required
+def user_export_mappings():
+    user_id = session['user_id']
+    
+    def generate():
+        for mapping in db.iter_user_mappings(user_id):
+            yield json.dumps(mapping_to_record(mapping)) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': 'attachment; filename=mappings.jsonl'})
+
+@app.route('/user/mappings/import', methods=['POST'])
+@login_required
+def user_import_mappings():
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Choose a JSONL file to import.', 'error')
+        return redirect(url_for('user_dashboard'))
+    
+    # Parse line by line and insert in fixed-size batches, so memory use
+    # doesn't grow with the size of the file
+    imported = 0
+    errors = []
+    batch = []
+    try:
+        # Read as bytes: a large upload is spooled to a temporary file that
+        # io.TextIOWrapper cannot wrap before Python 3.11
+        for line_number, line in enumerate(upload.stream, start=1):
+            line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            try:
+                batch.append(mapping_from_record(json.loads(line)))
+            except (ValueError, TypeError) as e:
+                errors.append(f'line {line_number}: {e}')
+                continue
+            if len(batch) >= Config.IMPORT_BATCH_SIZE:
+                imported += len(db.create_mappings(session['user_id'], batch))
+                batch = []
+        imported += len(db.create_mappings(session['user_id'], batch))
+    except UnicodeDecodeError:
+        errors.append('file is not valid UTF-8')
+    except Exception as e:
+        errors.append(f'import stopped: {str(e)}')
+    
+    # The imported mappings reach WireMock in bulk through the sync outbox
+    if imported:
+        sync_worker.notify()
+    
+    if errors:
+        shown = '; '.join(errors[:5])
+        more = f' (and {len(errors) - 5} more)' if len(errors) > 5 else ''
+        flash(f'Imported {imported} mappings, skipped {len(errors)} lines: {shown}{more}', 'warning')
+    else:
+        flash(f'Imported {imported} mappings.', 'success')
+    return redirect(url_for('user_dashboard'))
+
 @app.route('/user/mappings/<int:mapping_id>/edit', methods=['GET', 'POST'])
 @login_required
 def user_edit_mapping(mapping_id):
@@ -224,21 +527,17 @@ def user_edit_mapping(mapping_id):
         headers_input = request.form.get('response_headers', '').strip()
         if headers_input:
             try:
-                json.loads(headers_input)
+                validate_headers(headers_input)
                 updates['response_headers'] = headers_input
-            except:
-                flash('Invalid JSON format for response headers.', 'error')
+            except ValueError as e:
+                flash(f'Invalid response headers: {str(e)}', 'error')
                 return render_template('user/edit_mapping.html', mapping=mapping)
         else:
             updates['response_headers'] = '{}'
         
         try:
             db.update_mapping(mapping_id, session['user_id'], **updates)
-            
-            # Re-sync to WireMock
-            updated_mapping = db.get_mapping_by_id(mapping_id)
-            if updated_mapping['is_active']:
-                wiremock.sync_all_mappings(db.get_all_active_mappings())
+            sync_worker.notify()
             
             flash('Mapping updated successfully.', 'success')
             return redirect(url_for('user_dashboard'))
@@ -254,9 +553,7 @@ def user_toggle_mapping(mapping_id):
     if mapping:
         new_status = not mapping['is_active']
         db.update_mapping(mapping_id, session['user_id'], is_active=new_status)
-        
-        # Re-sync to WireMock
-        wiremock.sync_all_mappings(db.get_all_active_mappings())
+        sync_worker.notify()
         
         flash(f'Mapping {"activated" if new_status else "deactivated"}.', 'success')
     else:
@@ -268,13 +565,180 @@ def user_toggle_mapping(mapping_id):
 @login_required
 def user_delete_mapping(mapping_id):
     if db.delete_mapping(mapping_id, session['user_id']):
-        # Re-sync to WireMock
-        wiremock.sync_all_mappings(db.get_all_active_mappings())
+        sync_worker.notify()
         flash('Mapping deleted successfully.', 'success')
     else:
         flash('Error deleting mapping.', 'error')
     
     return redirect(url_for('user_dashboard'))
 
+@app.route('/user/tokens/create', methods=['POST'])
+@login_required
+def user_create_token():
+    name = request.form.get('name', '').strip()
+    if not name:
+        flash('Token name is required.', 'error')
+        return redirect(url_for('user_dashboard'))
+    
+    token = db.create_api_token(session['user_id'], name)
+    # Shown in this response only: a flash message would store it in the session cookie
+    response = make_response(render_template('user/token_created.html', name=name, token=token))
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/user/tokens/<int:token_id>/delete', methods=['POST'])
+@login_required
+def user_delete_token(token_id):
+    if db.delete_api_token(token_id, session['user_id']):
+        flash('API token revoked.', 'success')
+    else:
+        flash('Error revoking API token.', 'error')
+    
+    return redirect(url_for('user_dashboard'))
+
+# JSON API for CI pipelines, authenticated with per-user bearer tokens
+def token_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        user = db.get_user_by_api_token(token.strip()) if scheme.lower() == 'bearer' and token.strip() else None
+        if not user:
+            return jsonify({'error': 'A valid API token is required.'}), 401
+        g.api_user = user
+        return f(*args, **kwargs)
+    return decorated_function
+
+def api_batch(key):
+    """The non-empty list under key in the JSON body, or None if the body is malformed"""
+    payload = request.get_json(silent=True)
+    items = payload.get(key) if isinstance(payload, dict) else None
+    if not isinstance(items, list) or not items or len(items) > Config.API_MAX_BATCH:
+        return None
+    return items
+
+def api_batch_error(key):
+    return jsonify({'error': f'Expected a JSON object with a non-empty "{key}" list '
+                             f'of at most {Config.API_MAX_BATCH} items.'}), 400
+
+def api_batch_response(results, mapping_ids):
+    """Push the whole batch to WireMock in one sync pass and report per-item results"""
+    sync_worker.flush()
+    # Only the caller's own outbox rows: the worker's last_error may be about anyone's stubs
+    pending, error = db.get_pending_sync_status(mapping_ids)
+    return jsonify({
+        'results': results,
+        'sync': {
+            'success': pending == 0,
+            'pending': pending,
+            'error': (error or 'Changes are queued until WireMock accepts them') if pending else None
+        }
+    })
+
+def api_id_results(mapping_ids, found):
+    return [
+        {'index': index, 'id': mapping_id, 'success': ok, **({} if ok else {'error': 'mapping not found'})}
+        for index, (mapping_id, ok) in enumerate(zip(mapping_ids, found))
+    ]
+
+def api_ids(items):
+    try:
+        return [int(item) for item in items]
+    except (TypeError, ValueError):
+        return None
+
+@app.route('/api/v1/mappings/batch-create', methods=['POST'])
+@token_required
+def api_batch_create():
+    records = api_batch('mappings')
+    if records is None:
+        return api_batch_error('mappings')
+    
+    results, valid = [], []
+    for index, record in enumerate(records):
+        try:
+            valid.append(mapping_from_record(record))
+            results.append({'index': index, 'success': True})
+        except (TypeError, ValueError) as e:
+            results.append({'index': index, 'success': False, 'error': str(e)})
+    
+    mapping_ids = iter(db.create_mappings(g.api_user['id'], valid))
+    created = []
+    for result in results:
+        if result['success']:
+            result['id'] = next(mapping_ids)
+            created.append(result['id'])
+    return api_batch_response(results, created)
+
+@app.route('/api/v1/mappings/batch-update', methods=['POST'])
+@token_required
+def api_batch_update():
+    records = api_batch('mappings')
+    if records is None:
+        return api_batch_error('mappings')
+    
+    results, valid = [], []
+    for index, record in enumerate(records):
+        try:
+            valid.append(mapping_updates_from_record(record))
+            results.append({'index': index, 'id': valid[-1]['id'], 'success': True})
+        except (TypeError, ValueError) as e:
+            results.append({'index': index, 'success': False, 'error': str(e)})
+    
+    found = iter(db.update_mappings(g.api_user['id'], valid))
+    for result in results:
+        if result['success'] and not next(found):
+            result.update(success=False, error='mapping not found')
+    return api_batch_response(results, [r['id'] for r in results if r['success']])
+
+@app.route('/api/v1/mappings/batch-toggle', methods=['POST'])
+@token_required
+def api_batch_toggle():
+    mapping_ids = api_ids(api_batch('ids') or [])
+    if not mapping_ids:
+        return api_batch_error('ids')
+    
+    # Without is_active each mapping flips; with it they are all set to that value
+    is_active = (request.get_json(silent=True) or {}).get('is_active')
+    found = db.set_mappings_active(g.api_user['id'], mapping_ids, is_active)
+    owned = [mapping_id for mapping_id, ok in zip(mapping_ids, found) if ok]
+    return api_batch_response(api_id_results(mapping_ids, found), owned)
+
+@app.route('/api/v1/mappings/batch-delete', methods=['POST'])
+@token_required
+def api_batch_delete():
+    mapping_ids = api_ids(api_batch('ids') or [])
+    if not mapping_ids:
+        return api_batch_error('ids')
+    
+    found = db.delete_mappings(g.api_user['id'], mapping_ids)
+    owned = [mapping_id for mapping_id, ok in zip(mapping_ids, found) if ok]
+    return api_batch_response(api_id_results(mapping_ids, found), owned)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+# Built-in mock serving
+def serve_mock(path=''):
+    match = mock_engine.match(request.method, f'/{path}')
+    if match is None:
+        return Response('Request was not matched by any active mapping.\n', status=404,
+                        mimetype='text/plain')
+    
+    _, status, headers, body = match
+    response = Response(body, status=status, headers=headers)
+    # Like WireMock, only send a content type when the mapping defines one
+    if not any(name.lower() == 'content-type' for name in headers):
+        del response.headers['Content-Type']
+    return response
+
+if mock_engine:
+    mock_methods = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS']
+    app.add_url_rule(f'{Config.MOCK_ENGINE_PREFIX}/', 'serve_mock', serve_mock, methods=mock_methods)
+    app.add_url_rule(f'{Config.MOCK_ENGINE_PREFIX}/<path:path>', 'serve_mock', serve_mock,
+                     methods=mock_methods)
+
 if __name__ == '__main__':
+    if stub_exporter:
+        stub_exporter.export_all()
     app.run(host='0.0.0.0', port=5000, debug=True)
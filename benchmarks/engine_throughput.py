@@ -0,0 +1,111 @@
+"""Throughput of the built-in mock engine compared with serving through WireMock.
+
+Usage:
+    python -m benchmarks.engine_throughput --mappings 10000 --requests 20000
+    python -m benchmarks.engine_throughput --wiremock-url http://localhost:8080
+
+Results are printed as JSON. The WireMock run is skipped unless a URL is
+given; it replaces all stubs on that instance.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Project modules read Config when first imported, so they are imported in
+# main() only after the environment points them at the benchmark database
+
+METHODS = ['GET', 'POST', 'PUT', 'DELETE']
+
+def seed(db, count):
+    user_id = db.create_user('bench', 'bench')
+    with db.get_connection():
+        for i in range(count):
+            db.create_mapping(
+                user_id, f'mapping {i}', METHODS[i % len(METHODS)], f'/api/v1/items/{i}',
+                200, json.dumps({'id': i}), '{"Content-Type": "application/json"}', 1 + i % 10
+            )
+
+def request_mix(count, mappings, seed_value=42):
+    rng = random.Random(seed_value)
+    return [
+        (METHODS[i % len(METHODS)], f'/api/v1/items/{i}')
+        for i in (rng.randrange(mappings) for _ in range(count))
+    ]
+
+def rate(count, started):
+    elapsed = time.perf_counter() - started
+    return {'requests': count, 'seconds': round(elapsed, 4), 'requests_per_second': round(count / elapsed)}
+
+def bench_index(engine, requests):
+    engine.match('GET', '/')
+    started = time.perf_counter()
+    for method, path in requests:
+        engine.match(method, path)
+    return rate(len(requests), started)
+
+def bench_flask(app, prefix, requests):
+    client = app.test_client()
+    started = time.perf_counter()
+    for method, path in requests:
+        response = client.open(f'{prefix}{path}', method=method)
+        # A 404 here would mean the engine routes are missing, not that they are fast
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method} {prefix}{path} returned {response.status_code}')
+    return rate(len(requests), started)
+
+def bench_wiremock(url, db, requests):
+    import requests as http
+    from wiremock_service import WireMockService
+    
+    results = WireMockService(f'{url}/__admin').bulk_sync_mappings(db.get_all_active_mappings())
+    if not all(result['success'] for result in results):
+        return {'error': 'could not load stubs into WireMock'}
+    
+    session = http.Session()
+    started = time.perf_counter()
+    for method, path in requests:
+        session.request(method, f'{url}{path}')
+    return rate(len(requests), started)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mappings', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--wiremock-url', help='also measure a running WireMock instance')
+    args = parser.parse_args(argv)
+    
+    workdir = tempfile.mkdtemp(prefix='mock-bench-')
+    os.environ['DATABASE_PATH'] = os.path.join(workdir, 'bench.db')
+    os.environ['SYNC_WORKER_ENABLED'] = 'false'
+    os.environ['MOCK_ENGINE_ENABLED'] = 'true'
+    os.environ['HEALTH_CHECK_INTERVAL'] = '0'
+    
+    from database import Database
+    from mock_engine import MockEngine
+    
+    db = Database(os.environ['DATABASE_PATH'])
+    seed(db, args.mappings)
+    requests = request_mix(args.requests, args.mappings)
+    
+    results = {'mappings': args.mappings}
+    engine = MockEngine(db)
+    results['engine_index'] = bench_index(engine, requests)
+    
+    from app import app
+    from config import Config
+    results['engine_flask'] = bench_flask(app, Config.MOCK_ENGINE_PREFIX, requests)
+    
+    if args.wiremock_url:
+        results['wiremock_http'] = bench_wiremock(args.wiremock_url.rstrip('/'), db, requests)
+    
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""In-process stand-in for WireMock's admin API, for offline benchmarks.
+
+Implements the stub endpoints this project calls under ``/__admin``:
+``/mappings`` (GET, POST), ``/mappings/{id}`` (GET, PUT, DELETE),
+``/mappings/reset``, ``/mappings/import``, and ``/mappings/find-by-metadata``
+and ``/mappings/remove-by-metadata`` with ``matchesJsonPath`` patterns of
+the form ``{"expression": "$.a.b", "equalTo": "value"}``. The request
+journal is served from ``/requests`` (GET with ``since`` and ``limit``,
+newest first) and ``/requests/remove`` (POST with a ``method`` and exact
+``url`` pattern); ``log_request`` adds entries to it, since the fake serves
+no mock traffic itself. Every call can be
+delayed by a fixed latency to model a remote JVM.
+
+Usage:
+    python -m benchmarks.fake_wiremock --port 8080 --latency 0.002
+"""
+import argparse
+import calendar
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Stub ids, but not the fixed endpoints beside them, so calls are counted per endpoint
+STUB_PATH = re.compile(r'^/__admin/mappings/(?!(?:reset|import|find-by-metadata|remove-by-metadata)$)([^/]+)$')
+
+def metadata_matches(stub, pattern):
+    """Evaluate the simple dotted-path matchesJsonPath patterns this project sends"""
+    match = pattern.get('matchesJsonPath') or {}
+    value = stub.get('metadata') or {}
+    for key in match.get('expression', '$').split('.')[1:]:
+        if not isinstance(value, dict) or key not in value:
+            return False
+        value = value[key]
+    return str(value) == match.get('equalTo')
+
+def parse_since(value):
+    """Epoch milliseconds of an ISO 8601 UTC timestamp like 2024-01-02T03:04:05.678Z"""
+    seconds, _, fraction = value.rstrip('Z').partition('.')
+    milliseconds = int((fraction or '0')[:3].ljust(3, '0'))
+    return calendar.timegm(time.strptime(seconds, '%Y-%m-%dT%H:%M:%S')) * 1000 + milliseconds
+
+class FakeWireMock:
+    """Threaded HTTP server holding stubs in memory"""
+    
+    def __init__(self, port=0, latency=0.0):
+        self.latency = latency
+        self.stubs = {}
+        # Request journal entries, oldest first
+        self.journal = []
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+    
+    @property
+    def admin_url(self):
+        return f'{self.url}/__admin'
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-wiremock', daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def reset_counters(self):
+        with self._lock:
+            self.calls.clear()
+    
+    def log_request(self, stub_id=None, url='/', logged_at_ms=None):
+        """Add a journal entry as if WireMock had served a request, matched to stub_id if given"""
+        entry = {
+            'id': str(uuid.uuid4()),
+            'request': {'url': url, 'method': 'GET',
+                        'loggedDate': int(time.time() * 1000) if logged_at_ms is None else logged_at_ms},
+            'wasMatched': stub_id is not None,
+            'stubMapping': {'id': stub_id} if stub_id else None
+        }
+        with self._lock:
+            self.journal.append(entry)
+        return entry
+    
+    def handle(self, method, path, body, query=None):
+        """Apply one admin call, returning (status, response body)"""
+        if self.latency:
+            time.sleep(self.latency)
+        
+        with self._lock:
+            route = STUB_PATH.sub('/__admin/mappings/{id}', path)
+            key = f'{method} {route}'
+            self.calls[key] = self.calls.get(key, 0) + 1
+            
+            if path == '/__admin/mappings':
+                if method == 'GET':
+                    query = query or {}
+                    offset = int(query.get('offset', ['0'])[0])
+                    limit = int(query['limit'][0]) if 'limit' in query else len(self.stubs)
+                    stubs = list(self.stubs.values())[offset:offset + limit]
+                    return 200, {'mappings': stubs, 'meta': {'total': len(self.stubs)}}
+                if method == 'POST':
+                    stub = dict(body, id=body.get('id') or str(uuid.uuid4()))
+                    self.stubs[stub['id']] = stub
+                    return 201, stub
+            if path == '/__admin/mappings/reset' and method == 'POST':
+                self.stubs.clear()
+                return 200, None
+            if path == '/__admin/mappings/find-by-metadata' and method == 'POST':
+                return 200, {'mappings': [stub for stub in self.stubs.values() if metadata_matches(stub, body)]}
+            if path == '/__admin/mappings/remove-by-metadata' and method == 'POST':
+                for stub_id in [i for i, stub in self.stubs.items() if metadata_matches(stub, body)]:
+                    del self.stubs[stub_id]
+                return 200, None
+            if path == '/__admin/mappings/import' and method == 'POST':
+                for stub in body.get('mappings', []):
+                    stub.setdefault('id', str(uuid.uuid4()))
+                    self.stubs[stub['id']] = stub
+                return 200, None
+            
+            if path == '/__admin/requests' and method == 'GET':
+                query = query or {}
+                entries = self.journal
+                if 'since' in query:
+                    since = parse_since(query['since'][0])
+                    entries = [entry for entry in entries if entry['request']['loggedDate'] > since]
+                entries = entries[::-1]
+                if 'limit' in query:
+                    entries = entries[:int(query['limit'][0])]
+                return 200, {'requests': entries, 'meta': {'total': len(self.journal)}}
+            if path == '/__admin/requests/remove' and method == 'POST':
+                removed = [
+                    entry for entry in self.journal
+                    if body.get('method') in ('ANY', entry['request']['method'])
+                    and body.get('url') == entry['request']['url']
+                ]
+                self.journal = [entry for entry in self.journal if entry not in removed]
+                return 200, {'serveEvents': removed}
+            
+            match = STUB_PATH.match(path)
+            if match:
+                stub_id = match.group(1)
+                if stub_id not in self.stubs:
+                    return 404, None
+                if method == 'GET':
+                    return 200, self.stubs[stub_id]
+                if method == 'PUT':
+                    self.stubs[stub_id] = dict(body, id=stub_id)
+                    return 200, self.stubs[stub_id]
+                if method == 'DELETE':
+                    del self.stubs[stub_id]
+                    return 200, None
+        
+        return 404, None
+    
+    def _handler_class(self):
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _dispatch(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                url = urlsplit(self.path)
+                status, payload = fake.handle(method, url.path, body, parse_qs(url.query))
+                data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def do_GET(self):
+                self._dispatch('GET')
+            
+            def do_POST(self):
+                self._dispatch('POST')
+            
+            def do_PUT(self):
+                self._dispatch('PUT')
+            
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+        
+        return Handler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every call')
+    args = parser.parse_args(argv)
+    
+    fake = FakeWireMock(args.port, args.latency).start()
+    print(f'Fake WireMock admin API listening on {fake.admin_url}')
+    try:
+        fake._thread.join()
+    except KeyboardInterrupt:
+        fake.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""Repeatable benchmark suite for syncing, the Flask views and the Database layer.
+
+Usage:
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sizes 100 10000 --latency 0.002 --output before.json
+    python -m benchmarks.suite --sizes 100 10000 --baseline before.json
+
+Each size gets a fresh SQLite database seeded with the same generated
+mappings, and every WireMock call goes to an in-process fake
+(benchmarks.fake_wiremock), so runs need no network and are comparable
+across commits. Results are JSON: per size, per scenario, the number of
+operations with total, mean, p50, p95 and max latency in milliseconds.
+With --baseline, the mean of every scenario is also compared with an
+earlier results file and the ratios are printed to stderr.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_wiremock import FakeWireMock
+
+METHODS = ['GET', 'POST', 'PUT', 'DELETE']
+DEFAULT_SIZES = [100, 10000, 100000]
+
+def generate_mappings(count, seed_value=42):
+    rng = random.Random(seed_value)
+    return [{
+        'name': f'mapping {i}',
+        'request_method': METHODS[i % len(METHODS)],
+        'request_url': f'/api/v{1 + i % 3}/items/{i}',
+        'response_status': 200,
+        'response_body': json.dumps({'id': i, 'value': rng.random()}),
+        'response_headers': '{"Content-Type": "application/json"}',
+        'priority': 1 + i % 10
+    } for i in range(count)]
+
+def summarize(durations):
+    ordered = sorted(durations)
+    total = sum(ordered)
+    return {
+        'ops': len(ordered),
+        'total_ms': round(total * 1000, 3),
+        'mean_ms': round(total * 1000 / len(ordered), 3),
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3)
+    }
+
+def measure(operation, repeat=1):
+    durations = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        operation(i)
+        durations.append(time.perf_counter() - started)
+    return summarize(durations)
+
+def check_response(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f'{response.request.path} returned {response.status_code}')
+
+def check_outbox_drained(db):
+    depth = db.get_sync_outbox_stats()['depth']
+    if depth:
+        raise RuntimeError(f'{depth} changes are still waiting in the sync outbox')
+
+def bench_size(portal, fake, workdir, size, repeat):
+    from database import Database
+    from wiremock_service import WireMockService
+    from sync_worker import SyncWorker
+    from health import HealthMonitor
+    from mock_engine import MockEngine
+    from config import Config
+    
+    # The views use the module-level objects, so rebuild them all on this size's database
+    db = Database(os.path.join(workdir, f'bench-{size}.db'))
+    wiremock = WireMockService(fake.admin_url)
+    db.add_mapping_listener(wiremock.invalidate_stubs, remote=False)
+    portal.health_monitor.stop()
+    portal.db, portal.wiremock = db, wiremock
+    # The worker thread stays off so the sync scenarios below time the outbox drain on their own
+    portal.sync_worker = SyncWorker(db, wiremock)
+    portal.health_monitor = HealthMonitor(wiremock)
+    portal.health_monitor.start()
+    if portal.mock_engine:
+        portal.mock_engine = MockEngine(db)
+    results = {}
+    
+    user_id = db.create_user('bench', 'bench')
+    mappings = generate_mappings(size)
+    batch = Config.IMPORT_BATCH_SIZE
+    results['seed_create_mappings'] = measure(
+        lambda i: [db.create_mappings(user_id, mappings[start:start + batch])
+                   for start in range(0, size, batch)]
+    )
+    
+    results['sync_flush_seed'] = measure(lambda i: portal.sync_worker.flush())
+    check_outbox_drained(db)
+    
+    active = db.get_all_active_mappings()
+    results['get_all_active_mappings'] = measure(lambda i: db.get_all_active_mappings(), repeat=3)
+    results['bulk_sync_mappings'] = measure(lambda i: wiremock.bulk_sync_mappings(active))
+    results['sync_all_mappings'] = measure(lambda i: wiremock.sync_all_mappings(active))
+    if len(fake.stubs) != size:
+        raise RuntimeError(f'fake WireMock holds {len(fake.stubs)} stubs, expected {size}')
+    
+    # Views, through the Flask test client with a logged-in user
+    client = portal.app.test_client()
+    check_response(client.post('/login', data={'username': 'bench', 'password': 'bench'}))
+    targets = [m['id'] for m in random.Random(7).sample(active, min(repeat, size))]
+    
+    def edit(i):
+        mapping_id = targets[i % len(targets)]
+        check_response(client.post(f'/user/mappings/{mapping_id}/edit', data={
+            'name': f'edited {i}', 'request_method': 'GET', 'request_url': f'/edited/{mapping_id}',
+            'response_status': '200', 'response_body': json.dumps({'edit': i}),
+            'response_headers': '{"Content-Type": "application/json"}', 'priority': '5'
+        }))
+    
+    results['view_edit_mapping'] = measure(edit, repeat)
+    results['view_toggle_mapping'] = measure(
+        lambda i: check_response(client.post(f'/user/mappings/{targets[i % len(targets)]}/toggle')), repeat
+    )
+    results['sync_flush_edits'] = measure(lambda i: portal.sync_worker.flush())
+    check_outbox_drained(db)
+    results['view_user_dashboard'] = measure(lambda i: check_response(client.get('/user')), repeat)
+    
+    admin = portal.app.test_client()
+    check_response(admin.post('/login', data={'username': 'admin', 'password': 'admin123'}))
+    results['view_admin_dashboard'] = measure(lambda i: check_response(admin.get('/admin')), repeat)
+    
+    # Database CRUD on its own
+    created = []
+    results['db_create_mapping'] = measure(lambda i: created.append(db.create_mapping(
+        user_id, f'crud {i}', 'GET', f'/crud/{i}', 200, '{"crud": true}', None, 5
+    )), repeat)
+    results['db_get_mapping_by_id'] = measure(lambda i: db.get_mapping_by_id(created[i]), repeat)
+    results['db_update_mapping'] = measure(
+        lambda i: db.update_mapping(created[i], user_id, response_body=f'{{"crud": {i}}}'), repeat
+    )
+    results['db_get_user_mappings_page'] = measure(
+        lambda i: db.get_user_mappings_page(user_id, Config.PAGE_SIZE), repeat
+    )
+    results['db_delete_mapping'] = measure(lambda i: db.delete_mapping(created[i], user_id), repeat)
+    
+    portal.health_monitor.stop()
+    db.close()
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline, report):
+    """Print new/old mean latency per scenario present in both reports"""
+    print(f"{'size':>8}  {'scenario':<28} {'before ms':>12} {'after ms':>12} {'ratio':>7}", file=sys.stderr)
+    for size, scenarios in report['results'].items():
+        for name, result in scenarios.items():
+            before = baseline['results'].get(size, {}).get(name)
+            if not before:
+                continue
+            ratio = result['mean_ms'] / before['mean_ms'] if before['mean_ms'] else float('inf')
+            print(f"{size:>8}  {name:<28} {before['mean_ms']:>12.3f} {result['mean_ms']:>12.3f} {ratio:>7.2f}",
+                  file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=50, help='operations per view and CRUD scenario')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every fake WireMock call')
+    parser.add_argument('--output', help='write results to this file instead of stdout')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    args = parser.parse_args(argv)
+    
+    fake = FakeWireMock(latency=args.latency).start()
+    workdir = tempfile.mkdtemp(prefix='mock-bench-')
+    os.environ['DATABASE_PATH'] = os.path.join(workdir, 'app.db')
+    os.environ['WIREMOCK_URL'] = fake.url
+    os.environ['SYNC_WORKER_ENABLED'] = 'false'
+    
+    import app as portal
+    
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'parameters': {'sizes': args.sizes, 'repeat': args.repeat, 'latency': args.latency},
+        'results': {}
+    }
+    for size in args.sizes:
+        report['results'][str(size)] = bench_size(portal, fake, workdir, size, args.repeat)
+    fake.stop()
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(json.load(f), report)
+
+if __name__ == '__main__':
+    main()
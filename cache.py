@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional time-to-live and hit/miss counters.
+    
+    With maxbytes set, values must support len() and the cache also evicts
+    until their total length fits.
+    """
+    
+    def __init__(self, maxsize, ttl=None, maxbytes=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._pop(key)
+                self.misses += 1
+                return default
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def marker(self):
+        """Snapshot to pass to set() when the value is loaded after a miss"""
+        return self._invalidations
+    
+    def set(self, key, value, marker=None):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            # Drop values loaded before an invalidation; they may already be stale
+            if marker is not None and marker != self._invalidations:
+                return
+            # A value too large for the whole cache would only evict everything else
+            if self.maxbytes is not None and len(value) > self.maxbytes:
+                return
+            self._pop(key)
+            self._entries[key] = (value, expires_at)
+            if self.maxbytes is not None:
+                self.bytes += len(value)
+            while len(self._entries) > self.maxsize or (self.maxbytes is not None and self.bytes > self.maxbytes):
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and self.maxbytes is not None:
+            self.bytes -= len(entry[0])
+    
+    def invalidate(self, key):
+        with self._lock:
+            self._invalidations += 1
+            self._pop(key)
+    
+    def clear(self):
+        with self._lock:
+            self._invalidations += 1
+            self._entries.clear()
+            self.bytes = 0
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'bytes': self.bytes,
+                'maxbytes': self.maxbytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
@@ -3,5 +3,51 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     DATABASE_PATH = os.environ.get('DATABASE_PATH') or 'mock_server.db'
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE') or 8)
+    DATABASE_CACHE_SIZE_KB = int(os.environ.get('DATABASE_CACHE_SIZE_KB') or 65536)
+    DATABASE_MMAP_SIZE = int(os.environ.get('DATABASE_MMAP_SIZE') or 268435456)
+    DATABASE_BUSY_TIMEOUT_MS = int(os.environ.get('DATABASE_BUSY_TIMEOUT_MS') or 5000)
+    DATABASE_STATEMENT_CACHE_SIZE = int(os.environ.get('DATABASE_STATEMENT_CACHE_SIZE') or 256)
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE') or 1024)
+    USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL') or 30)
+    CHANGE_POLL_INTERVAL = float(os.environ.get('CHANGE_POLL_INTERVAL') or 1)
+    CHANGE_LOG_SIZE = int(os.environ.get('CHANGE_LOG_SIZE') or 100000)
+    BODY_COMPRESSION_THRESHOLD = int(os.environ.get('BODY_COMPRESSION_THRESHOLD') or 1024)
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE') or 1000)
+    PAGE_SIZE = int(os.environ.get('PAGE_SIZE') or 50)
+    API_MAX_BATCH = int(os.environ.get('API_MAX_BATCH') or 5000)
     WIREMOCK_URL = os.environ.get('WIREMOCK_URL') or 'http://localhost:8080'
     WIREMOCK_ADMIN_API = f'{WIREMOCK_URL}/__admin'
+    WIREMOCK_URLS = [url.strip() for url in (os.environ.get('WIREMOCK_URLS') or WIREMOCK_URL).split(',') if url.strip()]
+    WIREMOCK_ADMIN_APIS = [f'{url}/__admin' for url in WIREMOCK_URLS]
+    WIREMOCK_SHARDING = (os.environ.get('WIREMOCK_SHARDING') or 'replicate').lower()
+    WIREMOCK_FANOUT_WORKERS = int(os.environ.get('WIREMOCK_FANOUT_WORKERS') or 8)
+    WIREMOCK_IMPORT_CHUNK_SIZE = int(os.environ.get('WIREMOCK_IMPORT_CHUNK_SIZE') or 1000)
+    WIREMOCK_POOL_SIZE = int(os.environ.get('WIREMOCK_POOL_SIZE') or 10)
+    WIREMOCK_CONNECT_TIMEOUT = float(os.environ.get('WIREMOCK_CONNECT_TIMEOUT') or 2)
+    WIREMOCK_READ_TIMEOUT = float(os.environ.get('WIREMOCK_READ_TIMEOUT') or 10)
+    WIREMOCK_MAX_RETRIES = int(os.environ.get('WIREMOCK_MAX_RETRIES') or 3)
+    WIREMOCK_RETRY_BACKOFF = float(os.environ.get('WIREMOCK_RETRY_BACKOFF') or 0.2)
+    HEALTH_CHECK_INTERVAL = float(os.environ.get('HEALTH_CHECK_INTERVAL') or 5)
+    HEALTH_CHECK_TIMEOUT = float(os.environ.get('HEALTH_CHECK_TIMEOUT') or 1)
+    CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD') or 5)
+    CIRCUIT_RESET_SECONDS = float(os.environ.get('CIRCUIT_RESET_SECONDS') or 10)
+    STUB_CACHE_SIZE = int(os.environ.get('STUB_CACHE_SIZE') or 100000)
+    STUB_CACHE_MAX_BYTES = int(os.environ.get('STUB_CACHE_MAX_BYTES') or 67108864)
+    WIREMOCK_EXPORT_DIR = os.environ.get('WIREMOCK_EXPORT_DIR') or ''
+    SYNC_WORKER_ENABLED = (os.environ.get('SYNC_WORKER_ENABLED') or 'true').lower() == 'true'
+    SYNC_POLL_INTERVAL = float(os.environ.get('SYNC_POLL_INTERVAL') or 1)
+    SYNC_BATCH_SIZE = int(os.environ.get('SYNC_BATCH_SIZE') or 500)
+    SYNC_DEBOUNCE_SECONDS = float(os.environ.get('SYNC_DEBOUNCE_SECONDS') or 0.25)
+    SYNC_RETRY_BACKOFF = float(os.environ.get('SYNC_RETRY_BACKOFF') or 1)
+    SYNC_RETRY_MAX_BACKOFF = float(os.environ.get('SYNC_RETRY_MAX_BACKOFF') or 60)
+    SYNC_LEASE_TTL = float(os.environ.get('SYNC_LEASE_TTL') or 30)
+    SYNC_LEASE_WAIT = float(os.environ.get('SYNC_LEASE_WAIT') or 10)
+    MOCK_ENGINE_ENABLED = (os.environ.get('MOCK_ENGINE_ENABLED') or 'false').lower() == 'true'
+    MOCK_ENGINE_PREFIX = os.environ.get('MOCK_ENGINE_PREFIX') or '/mock'
+    RECONCILE_INTERVAL = float(os.environ.get('RECONCILE_INTERVAL') or 300)
+    JOURNAL_INTERVAL = float(os.environ.get('JOURNAL_INTERVAL') or 60)
+    JOURNAL_PAGE_SIZE = int(os.environ.get('JOURNAL_PAGE_SIZE') or 500)
+    JOURNAL_MAX_ENTRIES = int(os.environ.get('JOURNAL_MAX_ENTRIES') or 5000)
+    HIT_BUCKET_SECONDS = int(os.environ.get('HIT_BUCKET_SECONDS') or 3600)
+    HIT_COMPACT_AFTER = float(os.environ.get('HIT_COMPACT_AFTER') or 604800)
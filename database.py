@@ -1,17 +1,123 @@
+import os
+import queue
+import re
+import secrets
 import sqlite3
 import hashlib
+import threading
+import time
+import uuid
+import zlib
 from contextlib import contextmanager
+from cache import LRUCache
 from config import Config
+from metrics import timed_methods
 
+# Queries on the request and sync paths; check_query_plans() verifies they stay indexed
+USER_MAPPINGS_SQL = 'SELECT * FROM mock_mappings WHERE user_id = ? ORDER BY created_at DESC'
+ACTIVE_MAPPINGS_SQL = 'SELECT * FROM mock_mappings WHERE is_active = 1 ORDER BY priority DESC'
+# Columns a mapping's stub is built from, minus the body itself
+STUB_SOURCE_COLUMNS = ('id, user_id, wiremock_stub_id, request_method, request_url, '
+                       'response_status, response_body_hash, response_headers, priority')
+MAPPING_SUMMARY_COLUMNS = ('id, name, request_method, request_url, response_status, '
+                           'priority, is_active, created_at, updated_at')
+USER_SUMMARY_COLUMNS = 'id, username, is_admin, is_active, created_at'
+SEARCH_TRIGGERS = ['mock_mappings_search_insert', 'mock_mappings_search_delete', 'mock_mappings_search_update']
+PENDING_SYNC_SQL = '''
+    SELECT mapping_id, wiremock_stub_id, version, attempts FROM sync_outbox
+    WHERE next_attempt_at <= ? AND last_enqueued_at <= ?
+    ORDER BY first_enqueued_at
+    LIMIT ?
+'''
+
+class _Connection(sqlite3.Connection):
+    # Last PRAGMA data_version poll_changes() saw on this connection
+    data_version = None
+
+@timed_methods
 class Database:
+    HOT_QUERIES = {
+        'get_user_mappings': (USER_MAPPINGS_SQL, (1,)),
+        'get_all_active_mappings': (ACTIVE_MAPPINGS_SQL, ()),
+        'get_pending_sync_changes': (PENDING_SYNC_SQL, (0, 0, 1)),
+        'get_user_mappings_page': (
+            f'SELECT {MAPPING_SUMMARY_COLUMNS} FROM mock_mappings '
+            'WHERE user_id = ? AND (created_at, id) < (?, ?) '
+            'ORDER BY created_at DESC, id DESC LIMIT ?',
+            (1, '9999', 0, 50)
+        ),
+        'get_users_page': (
+            f'SELECT {USER_SUMMARY_COLUMNS} FROM users '
+            'WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?',
+            ('9999', 0, 50)
+        ),
+        'get_user_by_id': ('SELECT * FROM users WHERE id = ?', (1,)),
+        'verify_user': ('SELECT * FROM users WHERE username = ? AND is_active = 1', ('admin',)),
+    }
+    # Hot queries meant to walk an index in ORDER BY order and stop at their LIMIT
+    ORDERED_INDEX_SCANS = {'get_pending_sync_changes'}
+    
     def __init__(self, db_path=None):
         self.db_path = db_path or Config.DATABASE_PATH
+        self._local = threading.local()
+        self._reset_pool()
+        # User records are read on every authenticated page; writes below invalidate them
+        self._user_cache = LRUCache(Config.USER_CACHE_SIZE, Config.USER_CACHE_TTL)
+        self._mapping_listeners = []
+        self._remote_listeners = []
+        self._poll_lock = threading.Lock()
+        self._next_poll_at = 0
         self.init_db()
+        # Everything logged so far is already reflected in the empty caches
+        self._change_seq = self._latest_change_seq()
+    
+    def _reset_pool(self):
+        self._pool = queue.LifoQueue(maxsize=Config.DATABASE_POOL_SIZE)
+        self._pool_pid = os.getpid()
+        # Tags this process's change_log rows; a forked child is a new origin
+        self._origin = uuid.uuid4().hex
+    
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=Config.DATABASE_BUSY_TIMEOUT_MS / 1000,
+            cached_statements=Config.DATABASE_STATEMENT_CACHE_SIZE,
+            check_same_thread=False,
+            factory=_Connection
+        )
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers run alongside a writer; NORMAL sync is durable enough under WAL
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA cache_size = -{Config.DATABASE_CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size = {Config.DATABASE_MMAP_SIZE}')
+        conn.execute(f'PRAGMA busy_timeout = {Config.DATABASE_BUSY_TIMEOUT_MS}')
+        return conn
+    
+    def _checkout(self):
+        # Connections must not cross a fork, so a child process starts a fresh pool
+        if self._pool_pid != os.getpid():
+            self._reset_pool()
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._connect()
+    
+    def _checkin(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
     
     @contextmanager
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        # Nested calls on the same thread share the outer connection and transaction
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        
+        conn = self._local.conn = self._checkout()
         try:
             yield conn
             conn.commit()
@@ -19,7 +125,29 @@ class Database:
             conn.rollback()
             raise
         finally:
-            conn.close()
+            self._local.conn = None
+            self._checkin(conn)
+    
+    def add_mapping_listener(self, callback, remote=True):
+        """Call callback(mapping_ids) after mappings are created, updated or deleted.
+        
+        Unless remote is False, poll_changes() also passes on changes made by
+        other processes, with mapping_ids None when some were missed.
+        """
+        self._mapping_listeners.append(callback)
+        if remote:
+            self._remote_listeners.append(callback)
+    
+    def _notify_mapping_change(self, mapping_ids):
+        for callback in self._mapping_listeners:
+            callback(mapping_ids)
+    
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
     
     def init_db(self):
         with self.get_connection() as conn:
@@ -56,6 +184,8 @@ class Database:
                 )
             ''')
             
+            self._migrate(cursor)
+            
             # Create default admin user if not exists
             cursor.execute('SELECT COUNT(*) FROM users WHERE username = ?', ('admin',))
             if cursor.fetchone()[0] == 0:
@@ -65,6 +195,396 @@ class Database:
                     ('admin', admin_password, 1)
                 )
     
+    def _migrate(self, cursor):
+        # Schema changes are applied in order and tracked with PRAGMA user_version,
+        # so existing databases are upgraded in place on startup.
+        migrations = [
+            self._add_wiremock_stub_ids,
+            self._add_sync_outbox,
+            self._add_hot_query_indexes,
+            self._add_user_listing_index,
+            self._move_bodies_to_blobs,
+            self._add_mapping_hits,
+            self._add_api_tokens,
+            self._add_sync_leases,
+            self._add_search_index,
+            self._drop_search_function,
+            self._add_change_log,
+        ]
+        cursor.execute('PRAGMA user_version')
+        version = cursor.fetchone()[0]
+        for target, migration in enumerate(migrations[version:], start=version + 1):
+            migration(cursor)
+            cursor.execute(f'PRAGMA user_version = {target}')
+    
+    def _add_wiremock_stub_ids(self, cursor):
+        cursor.execute('PRAGMA table_info(mock_mappings)')
+        if 'wiremock_stub_id' not in [row['name'] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE mock_mappings ADD COLUMN wiremock_stub_id TEXT')
+        cursor.execute('SELECT id FROM mock_mappings WHERE wiremock_stub_id IS NULL')
+        cursor.executemany(
+            'UPDATE mock_mappings SET wiremock_stub_id = ? WHERE id = ?',
+            [(str(uuid.uuid4()), row['id']) for row in cursor.fetchall()]
+        )
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_mock_mappings_stub_id
+            ON mock_mappings (wiremock_stub_id)
+        ''')
+    
+    def _add_sync_outbox(self, cursor):
+        # One row per mapping with unsynced changes; repeated changes bump
+        # the version instead of adding rows, which coalesces them
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_outbox (
+                mapping_id INTEGER PRIMARY KEY,
+                wiremock_stub_id TEXT,
+                version INTEGER NOT NULL DEFAULT 1,
+                first_enqueued_at REAL NOT NULL,
+                last_enqueued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+        ''')
+    
+    def _add_hot_query_indexes(self, cursor):
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_mock_mappings_user_created
+            ON mock_mappings (user_id, created_at)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_mock_mappings_active_priority
+            ON mock_mappings (is_active, priority)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sync_outbox_first_enqueued
+            ON sync_outbox (first_enqueued_at)
+        ''')
+    
+    def _add_mapping_hits(self, cursor):
+        # Hits from WireMock's request journal, aggregated per mapping and time
+        # bucket so the dashboard never has to look at individual requests
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mapping_hits (
+                mapping_id INTEGER NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                hits INTEGER NOT NULL,
+                last_hit_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (mapping_id, bucket_start)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_mapping_hits_bucket ON mapping_hits (bucket_start)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS journal_cursors (
+                node TEXT PRIMARY KEY,
+                logged_at_ms INTEGER NOT NULL
+            )
+        ''')
+    
+    def _add_api_tokens(self, cursor):
+        # Only a hash of each token is stored; the token itself is shown once
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS api_tokens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                token_hash TEXT NOT NULL UNIQUE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_used_at TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_api_tokens_user ON api_tokens (user_id)')
+    
+    def _add_sync_leases(self, cursor):
+        # Cross-process leases; the generation grows on every acquisition and
+        # fences off work started under an earlier one
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                generation INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+    
+    def _add_search_index(self, cursor):
+        # Contentless FTS5 indexes keyed by mapping id, storing only tokens.
+        # Removing a row from a contentless index needs the values it was
+        # indexed with. Plain SQL triggers have those for names and URLs;
+        # bodies are compressed blobs SQL cannot read, so the methods that
+        # change a body keep mapping_body_search current in the same transaction.
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS mapping_search
+            USING fts5(name, request_url, content='', prefix='2 3')
+        ''')
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS mapping_body_search
+            USING fts5(body, content='', prefix='2 3')
+        ''')
+        index_new = '''
+            INSERT INTO mapping_search (rowid, name, request_url) VALUES (new.id, new.name, new.request_url);
+        '''
+        remove_old = '''
+            INSERT INTO mapping_search (mapping_search, rowid, name, request_url)
+            VALUES ('delete', old.id, old.name, old.request_url);
+        '''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS mock_mappings_search_insert AFTER INSERT ON mock_mappings
+            BEGIN {index_new} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS mock_mappings_search_delete AFTER DELETE ON mock_mappings
+            BEGIN {remove_old} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS mock_mappings_search_update
+            AFTER UPDATE OF name, request_url ON mock_mappings
+            BEGIN {remove_old} {index_new} END
+        ''')
+        self._fill_search_index(cursor)
+    
+    def _drop_search_function(self, cursor):
+        # The first search index had triggers calling a Python function, which
+        # broke writes from any client that had not registered it
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (SEARCH_TRIGGERS[0],))
+        row = cursor.fetchone()
+        if not row or 'body_text' not in row['sql']:
+            return
+        for trigger in SEARCH_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        cursor.execute('DROP TABLE IF EXISTS mapping_search')
+        self._add_search_index(cursor)
+    
+    def _add_change_log(self, cursor):
+        # Mapping and user writes, so processes sharing the file can update
+        # their in-memory copies with changes made by the others
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                row_id INTEGER NOT NULL
+            )
+        ''')
+    
+    def _fill_search_index(self, cursor):
+        cursor.execute("INSERT INTO mapping_search (mapping_search) VALUES ('delete-all')")
+        cursor.execute("INSERT INTO mapping_body_search (mapping_body_search) VALUES ('delete-all')")
+        cursor.execute('''
+            INSERT INTO mapping_search (rowid, name, request_url)
+            SELECT id, name, request_url FROM mock_mappings
+        ''')
+        rows = cursor.connection.execute('''
+            SELECT m.id, b.compressed, b.data FROM mock_mappings m
+            JOIN response_blobs b ON b.hash = m.response_body_hash
+        ''')
+        while True:
+            batch = rows.fetchmany(500)
+            if not batch:
+                break
+            self._index_bodies(cursor, [
+                (row['id'], self._decode_body(row['data'], row['compressed'])) for row in batch
+            ])
+    
+    def rebuild_search_index(self):
+        """Re-index every mapping, e.g. after bodies were changed by another SQLite client"""
+        with self.get_connection() as conn:
+            self._fill_search_index(conn.cursor())
+    
+    def _add_user_listing_index(self, cursor):
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_created ON users (created_at)')
+    
+    def _move_bodies_to_blobs(self, cursor):
+        # Bodies live once per distinct content in response_blobs, keyed by
+        # SHA-256; mock_mappings keeps only the hash
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS response_blobs (
+                hash TEXT PRIMARY KEY,
+                compressed INTEGER NOT NULL DEFAULT 0,
+                size INTEGER NOT NULL,
+                data BLOB NOT NULL
+            )
+        ''')
+        cursor.execute('PRAGMA table_info(mock_mappings)')
+        if 'response_body_hash' not in [row['name'] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE mock_mappings ADD COLUMN response_body_hash TEXT')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_mock_mappings_body_hash
+            ON mock_mappings (response_body_hash)
+        ''')
+        
+        rows = cursor.connection.execute(
+            'SELECT id, response_body FROM mock_mappings WHERE response_body IS NOT NULL'
+        )
+        while True:
+            batch = rows.fetchmany(500)
+            if not batch:
+                break
+            cursor.executemany(
+                'UPDATE mock_mappings SET response_body = NULL, response_body_hash = ? WHERE id = ?',
+                [(self._store_body(cursor, row['response_body']), row['id']) for row in batch]
+            )
+    
+    @staticmethod
+    def _store_body(cursor, body):
+        if not body:
+            return None
+        data = body.encode('utf-8')
+        body_hash = hashlib.sha256(data).hexdigest()
+        size = len(data)
+        compressed = 0
+        if len(data) >= Config.BODY_COMPRESSION_THRESHOLD:
+            packed = zlib.compress(data)
+            if len(packed) < len(data):
+                data, compressed = packed, 1
+        cursor.execute(
+            'INSERT OR IGNORE INTO response_blobs (hash, compressed, size, data) VALUES (?, ?, ?, ?)',
+            (body_hash, compressed, size, data)
+        )
+        return body_hash
+    
+    @staticmethod
+    def _release_bodies(cursor, body_hashes):
+        cursor.executemany('''
+            DELETE FROM response_blobs WHERE hash = ?
+            AND NOT EXISTS (SELECT 1 FROM mock_mappings WHERE response_body_hash = ?)
+        ''', [(body_hash, body_hash) for body_hash in set(body_hashes) if body_hash])
+    
+    @staticmethod
+    def _decode_body(data, compressed):
+        if compressed:
+            data = zlib.decompress(data)
+        return bytes(data).decode('utf-8')
+    
+    def _load_bodies(self, cursor, body_hashes):
+        """Map each given hash to its body text"""
+        hashes = list({body_hash for body_hash in body_hashes if body_hash})
+        bodies = {}
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            cursor.execute(
+                f'SELECT hash, compressed, data FROM response_blobs '
+                f'WHERE hash IN ({", ".join("?" for _ in chunk)})',
+                chunk
+            )
+            for row in cursor.fetchall():
+                bodies[row['hash']] = self._decode_body(row['data'], row['compressed'])
+        return bodies
+    
+    def _attach_bodies(self, cursor, mappings):
+        # Each distinct body is read and decompressed once; mappings sharing a
+        # fixture share the same string
+        bodies = self._load_bodies(cursor, [m['response_body_hash'] for m in mappings])
+        for mapping in mappings:
+            mapping['response_body'] = bodies.get(mapping['response_body_hash'], '')
+        return mappings
+    
+    @staticmethod
+    def _index_bodies(cursor, bodies):
+        """Add (mapping id, body text) pairs to the body search index"""
+        cursor.executemany(
+            'INSERT INTO mapping_body_search (rowid, body) VALUES (?, ?)',
+            [(mapping_id, body) for mapping_id, body in bodies if body]
+        )
+    
+    def _unindex_bodies(self, cursor, body_hashes):
+        """Remove mappings, given as {mapping id: body hash}, from the body search index"""
+        # Must run before their blobs are released, while the indexed text can still be read
+        bodies = self._load_bodies(cursor, body_hashes.values())
+        cursor.executemany(
+            "INSERT INTO mapping_body_search (mapping_body_search, rowid, body) VALUES ('delete', ?, ?)",
+            [(mapping_id, bodies[body_hash]) for mapping_id, body_hash in body_hashes.items() if body_hash in bodies]
+        )
+    
+    def check_query_plans(self):
+        """Return {query name: [plan steps]} for hot queries that scan a table or index, or sort in memory"""
+        problems = {}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for name, (sql, params) in self.HOT_QUERIES.items():
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                details = [row['detail'] for row in cursor.fetchall()]
+                bad = [
+                    detail for detail in details
+                    if (detail.startswith('SCAN ')
+                        and not (name in self.ORDERED_INDEX_SCANS and ' USING INDEX ' in detail))
+                    or detail.startswith('USE TEMP B-TREE')
+                ]
+                if bad:
+                    problems[name] = bad
+        return problems
+    
+    def _log_changes(self, cursor, kind, table, where, params):
+        cursor.execute(
+            f'INSERT INTO change_log (origin, kind, row_id) SELECT ?, ?, id FROM {table} WHERE {where}',
+            [self._origin, kind] + list(params)
+        )
+        cursor.execute(
+            'DELETE FROM change_log WHERE seq <= (SELECT MAX(seq) FROM change_log) - ?', (Config.CHANGE_LOG_SIZE,)
+        )
+    
+    def _latest_change_seq(self):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT MAX(seq) FROM change_log')
+            return cursor.fetchone()[0] or 0
+    
+    def poll_changes(self):
+        """Apply mapping and user changes committed by other processes to this one's caches and listeners"""
+        if time.monotonic() < self._next_poll_at:
+            return
+        with self._poll_lock:
+            self._next_poll_at = time.monotonic() + Config.CHANGE_POLL_INTERVAL
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # Changes only when another connection commits, so it usually saves the log query
+                cursor.execute('PRAGMA data_version')
+                data_version = cursor.fetchone()[0]
+                if data_version == conn.data_version:
+                    return
+                cursor.execute(
+                    'SELECT seq, origin, kind, row_id FROM change_log WHERE seq > ? ORDER BY seq',
+                    (self._change_seq,)
+                )
+                rows = cursor.fetchall()
+                conn.data_version = data_version
+            if not rows:
+                return
+            # Sequence numbers have no gaps, so one means the log was trimmed past our position
+            missed = rows[0]['seq'] != self._change_seq + 1
+            self._change_seq = rows[-1]['seq']
+            # Applied under the lock, so no caller returns before the changes it skipped are in
+            if missed:
+                self._user_cache.clear()
+                for callback in self._remote_listeners:
+                    callback(None)
+                return
+            remote = [row for row in rows if row['origin'] != self._origin]
+            for row in remote:
+                if row['kind'] == 'user':
+                    self._user_cache.invalidate(row['row_id'])
+            mapping_ids = list(dict.fromkeys(row['row_id'] for row in remote if row['kind'] == 'mapping'))
+            if mapping_ids:
+                for callback in self._remote_listeners:
+                    callback(mapping_ids)
+    
+    def _enqueue_sync(self, cursor, where, params):
+        self._log_changes(cursor, 'mapping', 'mock_mappings', where, params)
+        now = time.time()
+        cursor.execute(f'''
+            INSERT INTO sync_outbox
+            (mapping_id, wiremock_stub_id, first_enqueued_at, last_enqueued_at)
+            SELECT id, wiremock_stub_id, ?, ? FROM mock_mappings WHERE {where}
+            ON CONFLICT (mapping_id) DO UPDATE SET
+                wiremock_stub_id = excluded.wiremock_stub_id,
+                version = version + 1,
+                last_enqueued_at = excluded.last_enqueued_at,
+                attempts = 0,
+                next_attempt_at = 0,
+                last_error = NULL
+        ''', [now, now] + list(params))
+    
     @staticmethod
     def hash_password(password):
         return hashlib.sha256(password.encode()).hexdigest()
@@ -82,11 +602,24 @@ class Database:
         return None
     
     def get_user_by_id(self, user_id):
+        self.poll_changes()
+        user = self._user_cache.get(user_id)
+        if user is not None:
+            return dict(user)
+        
+        marker = self._user_cache.marker()
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
             user = cursor.fetchone()
-            return dict(user) if user else None
+            if not user:
+                return None
+            user = dict(user)
+            self._user_cache.set(user_id, user, marker)
+            return dict(user)
+    
+    def get_user_cache_stats(self):
+        return self._user_cache.stats()
     
     def get_all_users(self):
         with self.get_connection() as conn:
@@ -94,6 +627,46 @@ class Database:
             cursor.execute('SELECT id, username, is_admin, is_active, created_at FROM users')
             return [dict(row) for row in cursor.fetchall()]
     
+    def get_users_page(self, limit, after=None, newest_first=True, is_admin=None, is_active=None):
+        conditions = []
+        params = []
+        if is_admin is not None:
+            conditions.append('is_admin = ?')
+            params.append(1 if is_admin else 0)
+        if is_active is not None:
+            conditions.append('is_active = ?')
+            params.append(1 if is_active else 0)
+        return self._keyset_page(
+            f'SELECT {USER_SUMMARY_COLUMNS} FROM users', conditions, params,
+            limit, after, newest_first
+        )
+    
+    def _keyset_page(self, select, conditions, params, limit, after, newest_first):
+        # Pages are keyed on (created_at, id) so each page is an index range
+        # read, however deep into the listing it is
+        conditions = list(conditions)
+        params = list(params)
+        if after:
+            conditions.append(f'(created_at, id) {"<" if newest_first else ">"} (?, ?)')
+            params.extend(after)
+        direction = 'DESC' if newest_first else 'ASC'
+        sql = select
+        if conditions:
+            sql += f' WHERE {" AND ".join(conditions)}'
+        sql += f' ORDER BY created_at {direction}, id {direction} LIMIT ?'
+        params.append(limit + 1)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = [dict(row) for row in cursor.fetchall()]
+        
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after = (rows[-1]['created_at'], rows[-1]['id'])
+        return rows, next_after
+    
     def create_user(self, username, password, is_admin=False):
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -122,24 +695,141 @@ class Database:
                     f'UPDATE users SET {", ".join(updates)} WHERE id = ?',
                     params
                 )
-                return cursor.rowcount > 0
+                updated = cursor.rowcount > 0
+                self._log_changes(cursor, 'user', 'users', 'id = ?', [user_id])
+            self._user_cache.invalidate(user_id)
+            return updated
         return False
     
     def delete_user(self, user_id):
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute('DELETE FROM api_tokens WHERE user_id = ?', (user_id,))
+            self._log_changes(cursor, 'user', 'users', 'id = ?', [user_id])
             cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+        self._user_cache.invalidate(user_id)
+        return deleted
     
-    def get_user_mappings(self, user_id):
+    def create_api_token(self, user_id, name):
+        """Create an API token for a user and return it; it cannot be read back later"""
+        token = secrets.token_urlsafe(32)
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                'SELECT * FROM mock_mappings WHERE user_id = ? ORDER BY created_at DESC',
+                'INSERT INTO api_tokens (user_id, name, token_hash) VALUES (?, ?, ?)',
+                (user_id, name, self.hash_password(token))
+            )
+        return token
+    
+    def get_user_by_api_token(self, token):
+        """Active user owning the token, or None"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT t.id AS token_id, u.* FROM api_tokens t
+                JOIN users u ON u.id = t.user_id
+                WHERE t.token_hash = ? AND u.is_active = 1
+            ''', (self.hash_password(token),))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            cursor.execute(
+                'UPDATE api_tokens SET last_used_at = CURRENT_TIMESTAMP WHERE id = ?', (row['token_id'],)
+            )
+            return dict(row)
+    
+    def get_api_tokens(self, user_id):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT id, name, created_at, last_used_at FROM api_tokens WHERE user_id = ? ORDER BY id',
                 (user_id,)
             )
             return [dict(row) for row in cursor.fetchall()]
     
+    def delete_api_token(self, token_id, user_id):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM api_tokens WHERE id = ? AND user_id = ?', (token_id, user_id))
+            return cursor.rowcount > 0
+    
+    def get_user_mappings(self, user_id):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(USER_MAPPINGS_SQL, (user_id,))
+            return self._attach_bodies(cursor, [dict(row) for row in cursor.fetchall()])
+    
+    def get_user_mappings_page(self, user_id, limit, after=None, newest_first=True,
+                               request_method=None, is_active=None):
+        conditions = ['user_id = ?']
+        params = [user_id]
+        if request_method:
+            conditions.append('request_method = ?')
+            params.append(request_method)
+        if is_active is not None:
+            conditions.append('is_active = ?')
+            params.append(1 if is_active else 0)
+        return self._keyset_page(
+            f'SELECT {MAPPING_SUMMARY_COLUMNS} FROM mock_mappings', conditions, params,
+            limit, after, newest_first
+        )
+    
+    def search_mappings(self, query, user_id=None, request_method=None, response_status=None,
+                        is_active=None, limit=50):
+        """Mappings matching a full-text query on name, URL and response body.
+        
+        Every word of the query matches as a prefix, so "/payments/ref" finds
+        "/v2/payments/refund". All words must match in the name and URL, or
+        all in the body. Name and URL matches come first, then matches found
+        only in the body, each newest first. Without user_id every
+        user's mappings are searched. Each result carries its owner's username.
+        """
+        columns = ', '.join(f'm.{column.strip()}' for column in MAPPING_SUMMARY_COLUMNS.split(','))
+        conditions, params = [], []
+        if user_id is not None:
+            conditions.append('m.user_id = ?')
+            params.append(user_id)
+        if request_method:
+            conditions.append('m.request_method = ?')
+            params.append(request_method)
+        if response_status is not None:
+            conditions.append('m.response_status = ?')
+            params.append(response_status)
+        if is_active is not None:
+            conditions.append('m.is_active = ?')
+            params.append(1 if is_active else 0)
+        
+        terms = re.findall(r'\w+', query or '')
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if not terms:
+                where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+                cursor.execute(
+                    f'SELECT {columns}, u.username FROM mock_mappings m JOIN users u ON u.id = m.user_id'
+                    f'{where} ORDER BY m.id DESC LIMIT ?',
+                    params + [limit]
+                )
+                return [dict(row) for row in cursor.fetchall()]
+            
+            # Ranking every match costs a full pass over them, so results stream
+            # in rowid order instead and querying the indexes in turn does the ranking
+            phrases = ' '.join(f'"{term}"*' for term in terms)
+            results, found = [], set()
+            for index in ('mapping_search', 'mapping_body_search'):
+                cursor.execute(
+                    f'SELECT {columns}, u.username FROM {index} s '
+                    f'JOIN mock_mappings m ON m.id = s.rowid JOIN users u ON u.id = m.user_id '
+                    f'WHERE {" AND ".join([f"{index} MATCH ?"] + conditions)} '
+                    f'ORDER BY s.rowid DESC LIMIT ?',
+                    [phrases] + params + [limit + len(found)]
+                )
+                results.extend(dict(row) for row in cursor.fetchall() if row['id'] not in found)
+                found.update(row['id'] for row in results)
+                if len(results) >= limit:
+                    break
+            return results[:limit]
+    
     def get_mapping_by_id(self, mapping_id, user_id=None):
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -151,7 +841,9 @@ class Database:
             else:
                 cursor.execute('SELECT * FROM mock_mappings WHERE id = ?', (mapping_id,))
             mapping = cursor.fetchone()
-            return dict(mapping) if mapping else None
+            if not mapping:
+                return None
+            return self._attach_bodies(cursor, [dict(mapping)])[0]
     
     def create_mapping(self, user_id, name, request_method, request_url, 
                       response_status=200, response_body='', response_headers='{}',
@@ -161,11 +853,71 @@ class Database:
             cursor.execute('''
                 INSERT INTO mock_mappings 
                 (user_id, name, request_method, request_url, response_status, 
-                 response_body, response_headers, priority)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                 response_body_hash, response_headers, priority, wiremock_stub_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (user_id, name, request_method, request_url, response_status,
-                  response_body, response_headers, priority))
-            return cursor.lastrowid
+                  self._store_body(cursor, response_body), response_headers, priority,
+                  str(uuid.uuid4())))
+            mapping_id = cursor.lastrowid
+            self._index_bodies(cursor, [(mapping_id, response_body)])
+            self._enqueue_sync(cursor, 'id = ?', (mapping_id,))
+        self._notify_mapping_change([mapping_id])
+        return mapping_id
+    
+    def create_mappings(self, user_id, mappings):
+        """Insert many mappings in one transaction and return their ids"""
+        if not mappings:
+            return []
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            rows = [(
+                user_id, m['name'], m['request_method'], m['request_url'],
+                m.get('response_status', 200), self._store_body(cursor, m.get('response_body')),
+                m.get('response_headers', '{}'), m.get('priority', 5),
+                1 if m.get('is_active', True) else 0, str(uuid.uuid4())
+            ) for m in mappings]
+            cursor.executemany('''
+                INSERT INTO mock_mappings 
+                (user_id, name, request_method, request_url, response_status, 
+                 response_body_hash, response_headers, priority, is_active, wiremock_stub_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            # The transaction holds the write lock, so the new ids are contiguous
+            cursor.execute('SELECT last_insert_rowid()')
+            last_id = cursor.fetchone()[0]
+            first_id = last_id - len(rows) + 1
+            self._index_bodies(cursor, zip(range(first_id, last_id + 1), [m.get('response_body') for m in mappings]))
+            self._enqueue_sync(cursor, 'id BETWEEN ? AND ?', (first_id, last_id))
+        mapping_ids = list(range(first_id, last_id + 1))
+        self._notify_mapping_change(mapping_ids)
+        return mapping_ids
+    
+    def iter_user_mappings(self, user_id):
+        """Yield a user's mappings with bodies, streaming from the cursor"""
+        # Use a private connection so the open cursor doesn't pin this thread's
+        # transaction for as long as the consumer takes
+        conn = self._checkout()
+        try:
+            cursor = conn.execute('''
+                SELECT m.*, b.compressed AS body_compressed, b.data AS body_data
+                FROM mock_mappings m
+                LEFT JOIN response_blobs b ON b.hash = m.response_body_hash
+                WHERE m.user_id = ?
+                ORDER BY m.created_at, m.id
+            ''', (user_id,))
+            while True:
+                rows = cursor.fetchmany(200)
+                if not rows:
+                    break
+                for row in rows:
+                    mapping = dict(row)
+                    data = mapping.pop('body_data')
+                    compressed = mapping.pop('body_compressed')
+                    mapping['response_body'] = self._decode_body(data, compressed) if data else ''
+                    yield mapping
+        finally:
+            conn.rollback()
+            self._checkin(conn)
     
     def update_mapping(self, mapping_id, user_id, **kwargs):
         allowed_fields = ['name', 'request_method', 'request_url', 'response_status',
@@ -174,35 +926,435 @@ class Database:
         params = []
         
         for field in allowed_fields:
-            if field in kwargs:
+            if field in kwargs and field != 'response_body':
                 updates.append(f'{field} = ?')
                 params.append(kwargs[field])
         
-        if updates:
-            updates.append('updated_at = CURRENT_TIMESTAMP')
-            params.extend([mapping_id, user_id])
+        if updates or 'response_body' in kwargs:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                old_hash = None
+                if 'response_body' in kwargs:
+                    cursor.execute(
+                        'SELECT response_body_hash FROM mock_mappings WHERE id = ? AND user_id = ?',
+                        (mapping_id, user_id)
+                    )
+                    row = cursor.fetchone()
+                    if not row:
+                        return False
+                    old_hash = row['response_body_hash']
+                    updates.append('response_body_hash = ?')
+                    params.append(self._store_body(cursor, kwargs['response_body']))
+                updates.append('updated_at = CURRENT_TIMESTAMP')
+                params.extend([mapping_id, user_id])
+                
                 cursor.execute(
                     f'UPDATE mock_mappings SET {", ".join(updates)} WHERE id = ? AND user_id = ?',
                     params
                 )
-                return cursor.rowcount > 0
+                if cursor.rowcount == 0:
+                    return False
+                if 'response_body' in kwargs:
+                    self._unindex_bodies(cursor, {mapping_id: old_hash})
+                    self._index_bodies(cursor, [(mapping_id, kwargs['response_body'])])
+                self._release_bodies(cursor, [old_hash])
+                self._enqueue_sync(cursor, 'id = ? AND user_id = ?', (mapping_id, user_id))
+            self._notify_mapping_change([mapping_id])
+            return True
         return False
     
     def delete_mapping(self, mapping_id, user_id):
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            # Enqueue first, while the stub id can still be read from the row
+            self._enqueue_sync(cursor, 'id = ? AND user_id = ?', (mapping_id, user_id))
+            cursor.execute(
+                'SELECT response_body_hash FROM mock_mappings WHERE id = ? AND user_id = ?',
+                (mapping_id, user_id)
+            )
+            row = cursor.fetchone()
             cursor.execute(
                 'DELETE FROM mock_mappings WHERE id = ? AND user_id = ?',
                 (mapping_id, user_id)
             )
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+            if row:
+                self._unindex_bodies(cursor, {mapping_id: row['response_body_hash']})
+                self._release_bodies(cursor, [row['response_body_hash']])
+            if deleted:
+                cursor.execute('DELETE FROM mapping_hits WHERE mapping_id = ?', (mapping_id,))
+        if deleted:
+            self._notify_mapping_change([mapping_id])
+        return deleted
+    
+    def _owned_mappings(self, cursor, user_id, mapping_ids):
+        """Map the given ids that belong to the user to their body hashes"""
+        mapping_ids = list(set(mapping_ids))
+        owned = {}
+        for start in range(0, len(mapping_ids), 500):
+            chunk = mapping_ids[start:start + 500]
+            cursor.execute(
+                f'SELECT id, response_body_hash FROM mock_mappings '
+                f'WHERE user_id = ? AND id IN ({", ".join("?" for _ in chunk)})',
+                [user_id] + chunk
+            )
+            owned.update((row['id'], row['response_body_hash']) for row in cursor.fetchall())
+        return owned
+    
+    def _enqueue_sync_ids(self, cursor, mapping_ids):
+        mapping_ids = list(mapping_ids)
+        for start in range(0, len(mapping_ids), 500):
+            chunk = mapping_ids[start:start + 500]
+            self._enqueue_sync(cursor, f'id IN ({", ".join("?" for _ in chunk)})', chunk)
+    
+    def update_mappings(self, user_id, updates):
+        """Apply many partial updates, each a dict with 'id', in one transaction.
+        
+        Returns one flag per update telling whether the mapping was found.
+        """
+        allowed_fields = ['name', 'request_method', 'request_url', 'response_status',
+                         'response_headers', 'priority', 'is_active']
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            owned = self._owned_mappings(cursor, user_id, [u['id'] for u in updates])
+            # Repeated ids merge into one update, so each mapping stores and releases one body
+            merged = {}
+            for update in updates:
+                if update['id'] in owned:
+                    merged.setdefault(update['id'], {}).update(update)
+            # Updates touching the same columns share one executemany
+            groups = {}
+            released = []
+            bodies = {}
+            for update in merged.values():
+                columns = [field for field in allowed_fields if field in update]
+                params = [update[field] for field in columns]
+                if 'response_body' in update:
+                    columns.append('response_body_hash')
+                    params.append(self._store_body(cursor, update['response_body']))
+                    released.append(owned[update['id']])
+                    bodies[update['id']] = update['response_body']
+                groups.setdefault(tuple(columns), []).append(params + [update['id'], user_id])
+            
+            for columns, rows in groups.items():
+                assignments = ''.join(f'{column} = ?, ' for column in columns)
+                cursor.executemany(
+                    f'UPDATE mock_mappings SET {assignments}updated_at = CURRENT_TIMESTAMP '
+                    f'WHERE id = ? AND user_id = ?',
+                    rows
+                )
+            self._unindex_bodies(cursor, {mapping_id: owned[mapping_id] for mapping_id in bodies})
+            self._index_bodies(cursor, bodies.items())
+            self._release_bodies(cursor, released)
+            self._enqueue_sync_ids(cursor, owned)
+        if owned:
+            self._notify_mapping_change(list(owned))
+        return [update['id'] in owned for update in updates]
+    
+    def set_mappings_active(self, user_id, mapping_ids, is_active=None):
+        """Activate or deactivate many mappings in one transaction; None flips each one.
+        
+        Returns one flag per id telling whether the mapping was found.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            owned = self._owned_mappings(cursor, user_id, mapping_ids)
+            value = None if is_active is None else int(bool(is_active))
+            cursor.executemany('''
+                UPDATE mock_mappings
+                SET is_active = COALESCE(?, 1 - is_active), updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND user_id = ?
+            ''', [(value, mapping_id, user_id) for mapping_id in owned])
+            self._enqueue_sync_ids(cursor, owned)
+        if owned:
+            self._notify_mapping_change(list(owned))
+        return [mapping_id in owned for mapping_id in mapping_ids]
+    
+    def delete_mappings(self, user_id, mapping_ids):
+        """Delete many mappings in one transaction; returns one deleted flag per id"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            owned = self._owned_mappings(cursor, user_id, mapping_ids)
+            # Enqueue first, while the stub ids can still be read from the rows
+            self._enqueue_sync_ids(cursor, owned)
+            cursor.executemany(
+                'DELETE FROM mock_mappings WHERE id = ? AND user_id = ?',
+                [(mapping_id, user_id) for mapping_id in owned]
+            )
+            cursor.executemany(
+                'DELETE FROM mapping_hits WHERE mapping_id = ?', [(mapping_id,) for mapping_id in owned]
+            )
+            self._unindex_bodies(cursor, owned)
+            self._release_bodies(cursor, owned.values())
+        if owned:
+            self._notify_mapping_change(list(owned))
+        return [mapping_id in owned for mapping_id in mapping_ids]
+    
+    def get_pending_sync_status(self, mapping_ids):
+        """How many of the given mappings still wait in the outbox, and the last push error among them"""
+        mapping_ids = list(mapping_ids)
+        pending, last_error = 0, None
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(mapping_ids), 500):
+                chunk = mapping_ids[start:start + 500]
+                cursor.execute(
+                    f'''SELECT last_error FROM sync_outbox
+                        WHERE mapping_id IN ({", ".join("?" for _ in chunk)})''',
+                    chunk
+                )
+                for row in cursor.fetchall():
+                    pending += 1
+                    last_error = row['last_error'] or last_error
+        return pending, last_error
+    
+    def get_active_stub_sources(self, user_id=None):
+        """Active mappings without bodies, enough to fingerprint their stubs; optionally one user's only"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if user_id is None:
+                cursor.execute(f'SELECT {STUB_SOURCE_COLUMNS} FROM mock_mappings WHERE is_active = 1')
+            else:
+                cursor.execute(
+                    f'SELECT {STUB_SOURCE_COLUMNS} FROM mock_mappings WHERE user_id = ? AND is_active = 1',
+                    (user_id,)
+                )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def count_active_mappings(self):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM mock_mappings WHERE is_active = 1')
+            return cursor.fetchone()[0]
+    
+    def get_mappings_by_ids(self, mapping_ids):
+        mapping_ids = list(mapping_ids)
+        mappings = []
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(mapping_ids), 500):
+                chunk = mapping_ids[start:start + 500]
+                cursor.execute(
+                    f'SELECT * FROM mock_mappings WHERE id IN ({", ".join("?" for _ in chunk)})',
+                    chunk
+                )
+                mappings.extend(dict(row) for row in cursor.fetchall())
+            return self._attach_bodies(cursor, mappings)
     
     def get_all_active_mappings(self):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(ACTIVE_MAPPINGS_SQL)
+            return self._attach_bodies(cursor, [dict(row) for row in cursor.fetchall()])
+    
+    def has_pending_sync_changes(self, settled_before=None):
+        """Whether get_pending_sync_changes() would return anything, without reading mappings or bodies"""
+        now = time.time()
+        settled_before = now if settled_before is None else settled_before
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                'SELECT * FROM mock_mappings WHERE is_active = 1 ORDER BY priority DESC'
+                'SELECT EXISTS (SELECT 1 FROM sync_outbox WHERE next_attempt_at <= ? AND last_enqueued_at <= ?)',
+                (now, settled_before)
             )
-            return [dict(row) for row in cursor.fetchall()]
+            return bool(cursor.fetchone()[0])
+    
+    def get_pending_sync_changes(self, limit, settled_before=None):
+        now = time.time()
+        settled_before = now if settled_before is None else settled_before
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(PENDING_SYNC_SQL, (now, settled_before, limit))
+            changes = [dict(row) for row in cursor.fetchall()]
+            if not changes:
+                return changes
+            
+            # Attach the mapping's current state; None means it was deleted
+            placeholders = ', '.join('?' for _ in changes)
+            cursor.execute(
+                f'SELECT * FROM mock_mappings WHERE id IN ({placeholders})',
+                [change['mapping_id'] for change in changes]
+            )
+            mappings = {
+                mapping['id']: mapping
+                for mapping in self._attach_bodies(cursor, [dict(row) for row in cursor.fetchall()])
+            }
+            for change in changes:
+                change['mapping'] = mappings.get(change['mapping_id'])
+            return changes
+    
+    def complete_sync_changes(self, changes):
+        # A change that was re-enqueued meanwhile has a newer version and stays
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                'DELETE FROM sync_outbox WHERE mapping_id = ? AND version = ?',
+                [(change['mapping_id'], change['version']) for change in changes]
+            )
+    
+    def fail_sync_changes(self, changes):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                UPDATE sync_outbox
+                SET attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+                WHERE mapping_id = ? AND version = ?
+            ''', [(change['retry_at'], change['error'], change['mapping_id'], change['version'])
+                  for change in changes])
+    
+    def get_sync_outbox_stats(self):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT COUNT(*) AS depth,
+                       MIN(first_enqueued_at) AS oldest,
+                       COALESCE(SUM(attempts > 0), 0) AS failing
+                FROM sync_outbox
+            ''')
+            row = cursor.fetchone()
+            return {
+                'depth': row['depth'],
+                'lag_seconds': time.time() - row['oldest'] if row['oldest'] else 0.0,
+                'failing': row['failing']
+            }
+    
+    def acquire_sync_lease(self, name, holder, ttl):
+        """Take the named lease if it is free or expired, returning its new generation, else None"""
+        now = time.time()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO sync_leases (name, holder, generation, expires_at) VALUES (?, ?, 1, ?)
+                ON CONFLICT (name) DO UPDATE
+                SET holder = excluded.holder, generation = generation + 1, expires_at = excluded.expires_at
+                WHERE expires_at < ?
+            ''', (name, holder, now + ttl, now))
+            if cursor.rowcount < 1:
+                return None
+            cursor.execute('SELECT generation FROM sync_leases WHERE name = ?', (name,))
+            return cursor.fetchone()[0]
+    
+    def renew_sync_lease(self, name, generation, ttl):
+        """Extend a lease still held under generation; False once another process has taken it"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'UPDATE sync_leases SET expires_at = ? WHERE name = ? AND generation = ?',
+                (time.time() + ttl, name, generation)
+            )
+            return cursor.rowcount > 0
+    
+    def release_sync_lease(self, name, generation):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'UPDATE sync_leases SET expires_at = 0 WHERE name = ? AND generation = ?', (name, generation)
+            )
+    
+    def get_sync_lease(self, name):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM sync_leases WHERE name = ?', (name,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def get_journal_cursor(self, node):
+        """Logged time (epoch ms) of the newest journal entry ingested from a node"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT logged_at_ms FROM journal_cursors WHERE node = ?', (node,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
+    def record_mapping_hits(self, node, hits, logged_at_ms=None, bucket_seconds=3600):
+        """Add journal hits, given as (stub_id, logged_at_ms) pairs, to the bucketed counters.
+        
+        The node's cursor moves to logged_at_ms in the same transaction.
+        Returns how many hits belonged to a known mapping.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            stub_ids = list({stub_id for stub_id, _ in hits})
+            mapping_ids = {}
+            for start in range(0, len(stub_ids), 500):
+                chunk = stub_ids[start:start + 500]
+                cursor.execute(
+                    f'SELECT id, wiremock_stub_id FROM mock_mappings '
+                    f'WHERE wiremock_stub_id IN ({", ".join("?" for _ in chunk)})',
+                    chunk
+                )
+                mapping_ids.update((row['wiremock_stub_id'], row['id']) for row in cursor.fetchall())
+            
+            buckets = {}
+            for stub_id, hit_ms in hits:
+                mapping_id = mapping_ids.get(stub_id)
+                if mapping_id is None:
+                    continue
+                seconds = hit_ms // 1000
+                key = (mapping_id, seconds - seconds % bucket_seconds)
+                count, last_ms = buckets.get(key, (0, 0))
+                buckets[key] = (count + 1, max(last_ms, hit_ms))
+            
+            cursor.executemany('''
+                INSERT INTO mapping_hits (mapping_id, bucket_start, hits, last_hit_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (mapping_id, bucket_start) DO UPDATE SET
+                    hits = hits + excluded.hits,
+                    last_hit_at = MAX(last_hit_at, excluded.last_hit_at)
+            ''', [
+                (mapping_id, bucket_start, count,
+                 time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(last_ms / 1000)))
+                for (mapping_id, bucket_start), (count, last_ms) in buckets.items()
+            ])
+            
+            if logged_at_ms is not None:
+                cursor.execute('''
+                    INSERT INTO journal_cursors (node, logged_at_ms) VALUES (?, ?)
+                    ON CONFLICT (node) DO UPDATE SET logged_at_ms = MAX(logged_at_ms, excluded.logged_at_ms)
+                ''', (node, logged_at_ms))
+            return sum(count for count, _ in buckets.values())
+    
+    def compact_mapping_hits(self, before, bucket_seconds=86400):
+        """Merge hit buckets starting before the given epoch time into coarser buckets"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT mapping_id, bucket_start - bucket_start % ? AS coarse_start,
+                       SUM(hits) AS hits, MAX(last_hit_at) AS last_hit_at,
+                       COUNT(*) AS merged, MIN(bucket_start) AS first_start
+                FROM mapping_hits WHERE bucket_start < ?
+                GROUP BY mapping_id, coarse_start
+            ''', (bucket_seconds, before))
+            # A group that is already a single coarse bucket needs no rewrite
+            rows = [
+                (row['mapping_id'], row['coarse_start'], row['hits'], row['last_hit_at'])
+                for row in cursor.fetchall()
+                if row['merged'] > 1 or row['first_start'] != row['coarse_start']
+            ]
+            if not rows:
+                return 0
+            cursor.executemany(
+                'DELETE FROM mapping_hits WHERE mapping_id = ? AND bucket_start >= ? AND bucket_start < ?',
+                [(mapping_id, start, min(start + bucket_seconds, before)) for mapping_id, start, _, _ in rows]
+            )
+            cursor.executemany(
+                'INSERT INTO mapping_hits (mapping_id, bucket_start, hits, last_hit_at) VALUES (?, ?, ?, ?)',
+                rows
+            )
+            return len(rows)
+    
+    def get_mapping_hit_totals(self, mapping_ids):
+        """Total hits and last hit time per mapping, for the given mappings"""
+        mapping_ids = list(mapping_ids)
+        totals = {}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(mapping_ids), 500):
+                chunk = mapping_ids[start:start + 500]
+                cursor.execute(
+                    f'SELECT mapping_id, SUM(hits) AS hits, MAX(last_hit_at) AS last_hit_at FROM mapping_hits '
+                    f'WHERE mapping_id IN ({", ".join("?" for _ in chunk)}) GROUP BY mapping_id',
+                    chunk
+                )
+                totals.update((row['mapping_id'], dict(row)) for row in cursor.fetchall())
+        return totals
@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import threading
+from config import Config
+from database import Database
+from wiremock_service import WireMockService
+
+class StubExporter:
+    """Keeps a WireMock root directory (mappings/ and __files/) in step with the active mappings.
+    
+    WireMock started with ``--root-dir`` pointing here loads every stub from
+    disk at boot, so nothing has to be replayed through the admin API first.
+    Each mapping is written to ``mappings/mapping-<id>.json`` and each
+    distinct non-empty body once to ``__files/<sha256>``.
+    """
+    
+    def __init__(self, db, wiremock, root_dir):
+        self.db = db
+        self.wiremock = wiremock
+        self.root_dir = root_dir
+        self.mappings_dir = os.path.join(root_dir, 'mappings')
+        self.files_dir = os.path.join(root_dir, '__files')
+        self.last_error = None
+        self._lock = threading.Lock()
+        os.makedirs(self.mappings_dir, exist_ok=True)
+        os.makedirs(self.files_dir, exist_ok=True)
+        # The process making a change writes its files; the others would only rewrite the same bytes
+        db.add_mapping_listener(self.refresh, remote=False)
+    
+    @staticmethod
+    def _write_atomic(path, data):
+        # Write beside the target and rename over it, so WireMock never reads a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
+    def _mapping_path(self, mapping_id):
+        return os.path.join(self.mappings_dir, f'mapping-{mapping_id}.json')
+    
+    def _write_mapping(self, mapping):
+        stub = self.wiremock.build_stub(mapping)
+        body_hash = mapping.get('response_body_hash')
+        if body_hash:
+            body_path = os.path.join(self.files_dir, body_hash)
+            # Body files are content-addressed, so an existing one is already correct
+            if not os.path.exists(body_path):
+                self._write_atomic(body_path, mapping['response_body'].encode('utf-8'))
+            del stub['response']['body']
+            stub['response']['bodyFileName'] = body_hash
+        
+        self._write_atomic(self._mapping_path(mapping['id']), json.dumps(stub, indent=2).encode('utf-8'))
+        return body_hash
+    
+    def _remove_mapping(self, mapping_id):
+        try:
+            os.remove(self._mapping_path(mapping_id))
+        except FileNotFoundError:
+            pass
+    
+    def export_all(self):
+        """Rewrite the whole directory from the active mappings, returning how many were written.
+        
+        Files of other mappings are deleted, so this must run once, before
+        any worker process starts refreshing the directory; see export_once().
+        """
+        with self._lock:
+            wanted = set()
+            bodies = set()
+            for mapping in self.db.get_all_active_mappings():
+                body_hash = self._write_mapping(mapping)
+                wanted.add(os.path.basename(self._mapping_path(mapping['id'])))
+                if body_hash:
+                    bodies.add(body_hash)
+            
+            # Drop files of mappings that are gone and bodies nothing points at any more.
+            # Other worker processes may be writing here too, so leave their temp files alone.
+            for directory, keep in ((self.mappings_dir, wanted), (self.files_dir, bodies)):
+                for name in os.listdir(directory):
+                    if name not in keep and not name.startswith('.tmp-'):
+                        try:
+                            os.remove(os.path.join(directory, name))
+                        except FileNotFoundError:
+                            pass
+            
+            self.last_error = None
+            return len(wanted)
+    
+    def refresh(self, mapping_ids):
+        """Rewrite or remove the files of changed mappings only"""
+        try:
+            with self._lock:
+                mappings = {m['id']: m for m in self.db.get_mappings_by_ids(mapping_ids)}
+                for mapping_id in mapping_ids:
+                    mapping = mappings.get(mapping_id)
+                    if mapping and mapping['is_active']:
+                        self._write_mapping(mapping)
+                    else:
+                        self._remove_mapping(mapping_id)
+        except Exception as e:
+            # The database change has already committed; the next full export repairs the files
+            self.last_error = f"Error exporting mappings: {str(e)}"
+
+def export_once(root_dir=None):
+    """Rebuild the export directory from the database, for a server's startup hook or a deploy step"""
+    db = Database()
+    exporter = StubExporter(db, WireMockService(), root_dir or Config.WIREMOCK_EXPORT_DIR)
+    return exporter.export_all()
+
+if __name__ == '__main__':
+    print(f'Exported {export_once()} mappings')
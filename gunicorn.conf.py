@@ -0,0 +1,23 @@
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = os.environ.get('BIND') or '0.0.0.0:5000'
+workers = int(os.environ.get('WEB_CONCURRENCY') or multiprocessing.cpu_count() * 2 + 1)
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 60)
+graceful_timeout = 30
+accesslog = '-'
+
+# Each worker imports the app after it is forked, so it opens its own SQLite
+# connections and WireMock sessions and starts its own sync worker thread.
+# The sync workers take turns through the lease in SQLite.
+preload_app = False
+
+def on_starting(server):
+    # Rebuild the stub export directory once, before any worker is forked; a worker
+    # rebuilding it could delete another worker's new files. It runs in a child
+    # process so the master imports none of the app's modules.
+    if os.environ.get('WIREMOCK_EXPORT_DIR'):
+        subprocess.run([sys.executable, '-m', 'exporter'], cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
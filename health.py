@@ -0,0 +1,69 @@
+import threading
+import time
+from config import Config
+from metrics import WIREMOCK_UP, WIREMOCK_PROBE_DURATION
+
+class HealthMonitor:
+    """Probes every WireMock node in a background thread and caches the results.
+    
+    Pages read the cached health instead of calling WireMock, and the probes
+    drive each node's circuit breaker: a failed probe opens the circuit and
+    a successful one closes it again.
+    """
+    
+    def __init__(self, wiremock):
+        self.wiremock = wiremock
+        self.interval = Config.HEALTH_CHECK_INTERVAL
+        self.timeout = Config.HEALTH_CHECK_TIMEOUT
+        self.last_checked_at = None
+        self._health = {}
+        self._stopping = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Start the background thread if it is not running yet"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='wiremock-health', daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout=None):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+    
+    def _run(self):
+        while not self._stopping.is_set():
+            self.check()
+            self._stopping.wait(self.interval)
+    
+    def check(self):
+        """Probe every node now and cache the results"""
+        results = self.wiremock.probe_nodes(self.timeout)
+        checked_at = time.time()
+        health = {}
+        for node, (online, seconds, error) in zip(self.wiremock.nodes, results):
+            health[node.base_url] = {
+                'online': online,
+                'latency_ms': round(seconds * 1000, 1),
+                'checked_at': checked_at,
+                'probe_error': error
+            }
+            WIREMOCK_UP.set(1 if online else 0, node=node.base_url)
+            WIREMOCK_PROBE_DURATION.set(seconds, node=node.base_url)
+        # Swapped in whole, so readers never see a half-updated set
+        self._health = health
+        self.last_checked_at = checked_at
+        return health
+    
+    def node_health(self):
+        """Cached reachability, latency, circuit state and last sync outcome of every node"""
+        # Without the background thread there is nothing to read, so probe now
+        if not (self._thread and self._thread.is_alive()):
+            self.check()
+        health = self._health
+        return [
+            dict(node.status, circuit=node.breaker.state, **health.get(node.base_url, {'online': False}))
+            for node in self.wiremock.nodes
+        ]
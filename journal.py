@@ -0,0 +1,105 @@
+import time
+from config import Config
+
+def logged_at_ms(entry):
+    return int(entry['request']['loggedDate'])
+
+def iso_timestamp(ms):
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(ms // 1000)) + f'.{ms % 1000:03d}Z'
+
+class JournalCollector:
+    """Moves hits from WireMock's request journal into per-mapping counters in SQLite.
+    
+    Each node's journal is read newest first, a page at a time, starting
+    after the cursor stored for that node. For every distinct method and URL
+    on a page, one call removes the matching entries from WireMock and
+    returns them, and only the returned entries are counted. An entry is
+    therefore never counted twice, even one logged after the page was read,
+    and the journal stays small. A pass stops after removing max_entries
+    per node; the rest stay in the journal for the next pass.
+    """
+    
+    def __init__(self, db, wiremock):
+        self.db = db
+        self.wiremock = wiremock
+        self.page_size = Config.JOURNAL_PAGE_SIZE
+        self.max_entries = Config.JOURNAL_MAX_ENTRIES
+        self.last_report = None
+    
+    def run(self, fence=None):
+        """Collect every node's journal; fence, if given, is called before each page and raises to abort"""
+        report = {
+            'checked_at': time.time(),
+            'ingested': 0,
+            'attributed': 0,
+            'compacted': 0,
+            'backlog': False,
+            'error': None
+        }
+        for node in self.wiremock.nodes:
+            self._collect_node(node, report, fence)
+        
+        report['compacted'] = self.db.compact_mapping_hits(time.time() - Config.HIT_COMPACT_AFTER)
+        self.last_report = report
+        return report
+    
+    def _collect_node(self, node, report, fence):
+        cursor_ms = self.db.get_journal_cursor(node.base_url)
+        since = iso_timestamp(cursor_ms) if cursor_ms else None
+        newest_ms = cursor_ms
+        complete = True
+        seen = set()
+        removed = 0
+        
+        while True:
+            if removed >= self.max_entries:
+                # Older entries are still in the journal; keep the cursor so the next pass finds them
+                report['backlog'] = True
+                complete = False
+                break
+            if fence:
+                fence()
+            limit = min(self.page_size, self.max_entries - removed)
+            success, entries = node.get_requests(since=since, limit=limit)
+            if not success:
+                report['error'] = entries
+                complete = False
+                break
+            
+            # Entries still listed after being removed mean trimming isn't taking effect
+            entries = [entry for entry in entries if entry['id'] not in seen]
+            if not entries:
+                break
+            seen.update(entry['id'] for entry in entries)
+            
+            trimmed = {}
+            patterns = dict.fromkeys((entry['request']['method'], entry['request']['url']) for entry in entries)
+            for method, url in patterns:
+                success, result = node.remove_requests({'method': method, 'url': url})
+                if success:
+                    trimmed.update((entry['id'], entry) for entry in result)
+                else:
+                    report['error'] = result
+                    complete = False
+            seen.update(trimmed)
+            trimmed = list(trimmed.values())
+            removed += len(trimmed)
+            
+            hits = [
+                (entry['stubMapping']['id'], logged_at_ms(entry)) for entry in trimmed
+                if entry.get('wasMatched') and entry.get('stubMapping')
+            ]
+            report['attributed'] += self.db.record_mapping_hits(
+                node.base_url, hits, bucket_seconds=Config.HIT_BUCKET_SECONDS
+            )
+            report['ingested'] += len(trimmed)
+            if trimmed:
+                newest_ms = max([newest_ms or 0] + [logged_at_ms(entry) for entry in trimmed])
+            
+            if not complete or len(entries) < limit:
+                break
+        
+        # Entries left behind by a failed trim sit before the cursor, so only
+        # move it once everything up to it is gone
+        if complete and newest_ms and newest_ms != cursor_ms:
+            self.db.record_mapping_hits(node.base_url, [], logged_at_ms=newest_ms)
@@ -0,0 +1,188 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+
+# Latency buckets in seconds, fine enough at the low end for SQLite calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labelnames)
+    
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in self._values.items()]
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for name, key, extra, value in self._samples():
+            lines.append(f'{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}')
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+    
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = 'gauge'
+    
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self._function = function
+    
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+    
+    def _samples(self):
+        # Function gauges are only evaluated when someone scrapes
+        if self._function is not None:
+            return [(self.name, (), (), self._function())]
+        return super()._samples()
+
+class Histogram(_Metric):
+    kind = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket counts plus an overflow slot; made cumulative at render time
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+    
+    def _samples(self):
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        
+        samples = []
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append((f'{self.name}_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+            samples.append((f'{self.name}_sum', key, (), total))
+            samples.append((f'{self.name}_count', key, (), count))
+        return samples
+
+class Registry:
+    """Process-wide set of metrics, rendered in the Prometheus text format"""
+    
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+    
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+    
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self.register(Gauge(name, documentation, labelnames, function))
+    
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'mockpoc_http_request_duration_seconds', 'Time spent handling Flask requests',
+    ('endpoint', 'method', 'status')
+)
+TEMPLATE_RENDER_DURATION = REGISTRY.histogram(
+    'mockpoc_template_render_duration_seconds', 'Time spent rendering Jinja templates', ('template',)
+)
+DB_CALL_DURATION = REGISTRY.histogram(
+    'mockpoc_db_call_duration_seconds', 'Time spent in Database methods', ('method',)
+)
+DB_CALL_ERRORS = REGISTRY.counter(
+    'mockpoc_db_call_errors_total', 'Database method calls that raised', ('method',)
+)
+WIREMOCK_REQUEST_DURATION = REGISTRY.histogram(
+    'mockpoc_wiremock_request_duration_seconds', 'Time spent in WireMock admin API calls',
+    ('node', 'method', 'path', 'status')
+)
+WIREMOCK_RETRIES = REGISTRY.counter(
+    'mockpoc_wiremock_retries_total', 'Automatic retries of WireMock admin API calls', ('node', 'method', 'path')
+)
+WIREMOCK_FULL_SYNC_DURATION = REGISTRY.gauge(
+    'mockpoc_wiremock_full_sync_duration_seconds', 'Duration of the last full sync to WireMock'
+)
+WIREMOCK_UP = REGISTRY.gauge(
+    'mockpoc_wiremock_up', 'Whether the last health probe of a WireMock node succeeded', ('node',)
+)
+WIREMOCK_PROBE_DURATION = REGISTRY.gauge(
+    'mockpoc_wiremock_probe_duration_seconds', 'Duration of the last health probe of a WireMock node', ('node',)
+)
+
+def timed_methods(cls):
+    """Class decorator timing every public method into DB_CALL_DURATION"""
+    for name, method in list(vars(cls).items()):
+        # Generators and context managers return before doing any work, so timing them would be meaningless
+        if (name.startswith('_') or not inspect.isfunction(method)
+                or inspect.isgeneratorfunction(inspect.unwrap(method))):
+            continue
+        setattr(cls, name, _timed(method, name))
+    return cls
+
+def _timed(method, label):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            DB_CALL_ERRORS.inc(method=label)
+            raise
+        finally:
+            DB_CALL_DURATION.observe(time.perf_counter() - start, method=label)
+    return wrapper
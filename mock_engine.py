@@ -0,0 +1,157 @@
+import bisect
+import itertools
+import json
+import threading
+
+class _TrieNode:
+    __slots__ = ('children', 'routes')
+    
+    def __init__(self):
+        self.children = {}
+        # Sorted (priority, -sequence, mapping_id) keys of the routes ending here
+        self.routes = []
+
+class RouteIndex:
+    """Per-method path trie over active mappings.
+    
+    Matching follows the WireMock stubs built by WireMockService: ``urlPath``
+    is an exact match on the path (the query string is ignored), ``ANY``
+    matches every method, a lower ``priority`` number wins and ties go to the
+    most recently added stub.
+    """
+    
+    def __init__(self):
+        self._roots = {}
+        self._routes = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _segments(path):
+        return path.split('/')
+    
+    def rebuild(self, mappings):
+        """Replace the whole index with the given active mappings"""
+        roots = {}
+        routes = {}
+        sequence = itertools.count()
+        for mapping in sorted(mappings, key=lambda m: m['id']):
+            self._insert(roots, routes, sequence, mapping)
+        with self._lock:
+            self._roots, self._routes, self._sequence = roots, routes, sequence
+    
+    def upsert(self, mapping):
+        """Add a mapping, replacing any previous version of it"""
+        with self._lock:
+            self._remove(mapping['id'])
+            self._insert(self._roots, self._routes, self._sequence, mapping)
+    
+    def remove(self, mapping_id):
+        with self._lock:
+            self._remove(mapping_id)
+    
+    def _insert(self, roots, routes, sequence, mapping):
+        method = mapping['request_method'].upper()
+        node = roots.setdefault(method, _TrieNode())
+        for segment in self._segments(mapping['request_url']):
+            node = node.children.setdefault(segment, _TrieNode())
+        key = (mapping['priority'], -next(sequence), mapping['id'])
+        bisect.insort(node.routes, key)
+        routes[mapping['id']] = (method, mapping['request_url'], key, self._compile_response(mapping))
+    
+    def _remove(self, mapping_id):
+        route = self._routes.pop(mapping_id, None)
+        if route is None:
+            return
+        method, path, key, _ = route
+        node = self._roots.get(method)
+        for segment in self._segments(path):
+            node = node.children[segment]
+        node.routes.remove(key)
+    
+    @staticmethod
+    def _compile_response(mapping):
+        headers = {}
+        if mapping['response_headers']:
+            try:
+                headers = json.loads(mapping['response_headers'])
+            except ValueError:
+                pass
+        return mapping['response_status'], headers, mapping['response_body'] or ''
+    
+    def _lookup(self, method, segments):
+        node = self._roots.get(method)
+        for segment in segments:
+            if node is None:
+                return None
+            node = node.children.get(segment)
+        if node is None or not node.routes:
+            return None
+        return node.routes[0]
+    
+    def match(self, method, path):
+        """Return (mapping_id, status, headers, body) for the best match, or None"""
+        segments = self._segments(path)
+        with self._lock:
+            candidates = [
+                key for key in (self._lookup(method.upper(), segments), self._lookup('ANY', segments))
+                if key is not None
+            ]
+            if not candidates:
+                return None
+            mapping_id = min(candidates)[2]
+            status, headers, body = self._routes[mapping_id][3]
+            return mapping_id, status, headers, body
+    
+    def __len__(self):
+        return len(self._routes)
+
+class MockEngine:
+    """Serves mock traffic straight from mock_mappings without WireMock.
+    
+    Changes made in this process re-index through the mapping listener;
+    changes made by other processes are picked up from the database's change
+    log before each match.
+    """
+    
+    def __init__(self, db):
+        self.db = db
+        self.index = RouteIndex()
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        db.add_mapping_listener(self.refresh)
+    
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self.index.rebuild(self.db.get_all_active_mappings())
+                self._loaded = True
+    
+    def reload(self):
+        """Rebuild the index from the database"""
+        self._loaded = False
+        self._ensure_loaded()
+    
+    def refresh(self, mapping_ids):
+        """Re-index changed mappings only, or everything on the next match if mapping_ids is None"""
+        # Waiting on the load lock orders this after any rebuild in progress
+        with self._load_lock:
+            if not self._loaded:
+                return
+            if mapping_ids is None:
+                self._loaded = False
+                return
+            mappings = {m['id']: m for m in self.db.get_mappings_by_ids(mapping_ids)}
+            for mapping_id in mapping_ids:
+                mapping = mappings.get(mapping_id)
+                if mapping and mapping['is_active']:
+                    self.index.upsert(mapping)
+                else:
+                    self.index.remove(mapping_id)
+    
+    def match(self, method, path):
+        self.db.poll_changes()
+        self._ensure_loaded()
+        return self.index.match(method, path)
@@ -0,0 +1,92 @@
+import time
+
+class Reconciler:
+    """Finds and repairs drift between mock_mappings and the stubs loaded in WireMock"""
+    
+    def __init__(self, db, wiremock):
+        self.db = db
+        self.wiremock = wiremock
+        self.last_report = None
+    
+    @staticmethod
+    def new_report(error=None):
+        return {
+            'checked_at': time.time(),
+            'missing': 0,
+            'stale': 0,
+            'orphaned': 0,
+            'drift': 0,
+            'repaired': 0,
+            'failed': 0,
+            'error': error
+        }
+    
+    def run(self, fence=None, user_id=None):
+        """Compare fingerprints once and repair only the stubs that differ.
+        
+        With user_id, only that user's mappings and the stubs tagged with their
+        id are compared, so other users' stubs are never touched. fence, if
+        given, is called before each write and raises to abort the repair.
+        """
+        report = self.new_report()
+        sources = self.db.get_active_stub_sources(user_id)
+        
+        # Each node is compared against the stubs it should hold under the
+        # sharding mode, so a mapping that moved shards is removed from its old node
+        for node in self.wiremock.nodes:
+            self._reconcile_node(node, sources, report, fence, user_id)
+        
+        if user_id is None:
+            self.last_report = report
+        return report
+    
+    def _reconcile_node(self, node, sources, report, fence, user_id):
+        if user_id is None:
+            success, stubs = self.wiremock.get_all_stubs(node)
+        else:
+            success, stubs = self.wiremock.find_user_stubs(user_id, node)
+        if not success:
+            report['error'] = stubs
+            return
+        
+        remote = {stub.get('id'): self.wiremock.remote_fingerprint(stub) for stub in stubs}
+        expected = {
+            source['wiremock_stub_id']: (source['id'], self.wiremock.stub_fingerprint(source))
+            for source in sources if node in self.wiremock.nodes_for(source)
+        }
+        
+        missing = [mapping_id for stub_id, (mapping_id, _) in expected.items() if stub_id not in remote]
+        stale = [
+            mapping_id for stub_id, (mapping_id, fingerprint) in expected.items()
+            if stub_id in remote and remote[stub_id] != fingerprint
+        ]
+        orphaned = [stub_id for stub_id in remote if stub_id not in expected]
+        report['missing'] += len(missing)
+        report['stale'] += len(stale)
+        report['orphaned'] += len(orphaned)
+        report['drift'] += len(missing) + len(stale) + len(orphaned)
+        
+        # Bodies are loaded only for the mappings that actually need pushing
+        if missing or stale:
+            results = self.wiremock.import_mappings(
+                self.db.get_mappings_by_ids(missing + stale), nodes=[node], fence=fence
+            )
+            for result in results:
+                report['repaired' if result['success'] else 'failed'] += 1
+                if not result['success']:
+                    report['error'] = result['result']
+        
+        if orphaned and fence:
+            fence()
+        # A user left with nothing on this node loses all their stubs in one call
+        if user_id is not None and orphaned and not expected:
+            success, result = self.wiremock.remove_user_stubs(user_id, nodes=[node])
+            report['repaired' if success else 'failed'] += len(orphaned)
+            if not success:
+                report['error'] = result
+            return
+        for stub_id in orphaned:
+            success, result = self.wiremock.remove_mapping_stub(stub_id, nodes=[node])
+            report['repaired' if success else 'failed'] += 1
+            if not success:
+                report['error'] = result
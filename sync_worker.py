@@ -0,0 +1,261 @@
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+from reconciler import Reconciler
+from journal import JournalCollector
+
+# Lease names; writes to WireMock and journal collection are each done by one process at a time
+SYNC_LEASE = 'wiremock'
+JOURNAL_LEASE = 'journal'
+
+class SyncAborted(Exception):
+    """Raised by a lease fence once another process has taken the lease over"""
+
+class SyncWorker:
+    """Drains the sync outbox to WireMock in a background thread.
+    
+    Every process running the app has its own worker, but they coordinate
+    through leases in SQLite: only the process holding the sync lease writes
+    to WireMock, and a pass that loses its lease aborts at the next chunk.
+    """
+    
+    def __init__(self, db, wiremock):
+        self.db = db
+        self.wiremock = wiremock
+        self.poll_interval = Config.SYNC_POLL_INTERVAL
+        self.batch_size = Config.SYNC_BATCH_SIZE
+        self.debounce = Config.SYNC_DEBOUNCE_SECONDS
+        self.reconciler = Reconciler(db, wiremock)
+        self.reconcile_interval = Config.RECONCILE_INTERVAL
+        self._next_reconcile_at = time.monotonic() + self.reconcile_interval
+        self.collector = JournalCollector(db, wiremock)
+        self.journal_interval = Config.JOURNAL_INTERVAL
+        self.lease_ttl = Config.SYNC_LEASE_TTL
+        self.lease_wait = Config.SYNC_LEASE_WAIT
+        self.last_run_at = None
+        self.last_error = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._journal_thread = None
+    
+    def start(self):
+        """Start the background threads if they are not running yet"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='wiremock-sync', daemon=True)
+        self._thread.start()
+        # Trimming the journal takes an admin call per distinct URL, so it gets its
+        # own thread instead of holding up the outbox drain
+        if self.journal_interval:
+            self._journal_thread = threading.Thread(target=self._run_journal, name='wiremock-journal', daemon=True)
+            self._journal_thread.start()
+    
+    def stop(self, timeout=None):
+        """Stop the background threads"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in (self._thread, self._journal_thread):
+            if thread:
+                thread.join(timeout)
+    
+    @property
+    def holder(self):
+        # Read per call, since the worker may be created before a pre-fork server forks
+        return f'{socket.gethostname()}:{os.getpid()}'
+    
+    @contextmanager
+    def lease(self, name=SYNC_LEASE, wait=0):
+        """Hold a cross-process lease for the block, yielding its fence, or None if it stayed taken for wait seconds.
+        
+        The fence renews the lease and raises SyncAborted once another
+        process has taken it over, so long passes call it between chunks.
+        """
+        deadline = time.monotonic() + wait
+        generation = self.db.acquire_sync_lease(name, self.holder, self.lease_ttl)
+        while generation is None and time.monotonic() < deadline:
+            time.sleep(min(0.05, self.lease_ttl))
+            generation = self.db.acquire_sync_lease(name, self.holder, self.lease_ttl)
+        if generation is None:
+            yield None
+            return
+        
+        def fence():
+            if not self.db.renew_sync_lease(name, generation, self.lease_ttl):
+                raise SyncAborted(f'Another process took over the {name} lease')
+        
+        try:
+            yield fence
+        finally:
+            self.db.release_sync_lease(name, generation)
+    
+    def notify(self):
+        """Tell the worker that new changes are waiting in the outbox"""
+        self._wakeup.set()
+    
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                processed = self.run_once()
+                if self.reconcile_interval and time.monotonic() >= self._next_reconcile_at:
+                    self.reconcile(wait=0)
+            except Exception as e:
+                self.last_error = f"Sync worker error: {str(e)}"
+                processed = 0
+            
+            # A full batch means there is probably more waiting
+            if processed >= self.batch_size:
+                continue
+            
+            if self._wakeup.wait(self.poll_interval):
+                self._wakeup.clear()
+                # Give bursts of edits to the same mapping time to coalesce
+                self._stopping.wait(self.debounce)
+    
+    def _run_journal(self):
+        while not self._stopping.wait(self.journal_interval):
+            try:
+                self.collect_hits()
+            except Exception as e:
+                self.last_error = f"Journal collection error: {str(e)}"
+    
+    def run_once(self, settle=True, wait=0):
+        """Push one batch of pending changes to WireMock, returning how many were handled"""
+        settled_before = time.time() - self.debounce if settle else None
+        # Idle polls only read; the lease is taken when there is something to push
+        if not self.db.has_pending_sync_changes(settled_before=settled_before):
+            return 0
+        # With every node's circuit open the push could only fail, so the
+        # changes wait in the outbox without using up their retries
+        if not self.wiremock.available():
+            self.last_error = 'WireMock is unavailable; changes are queued until it recovers'
+            return 0
+        
+        with self._lock, self.lease(wait=wait) as fence:
+            if fence is None:
+                return 0
+            # Read under the lease, so nothing pushed is older than what the previous holder pushed
+            changes = self.db.get_pending_sync_changes(self.batch_size, settled_before=settled_before)
+            try:
+                return self._push(changes, fence)
+            except SyncAborted as e:
+                # Nothing is marked done; the new holder pushes these changes again
+                self.last_error = str(e)
+                return 0
+    
+    def _push(self, changes, fence):
+        if not changes:
+            return 0
+        
+        upserts = [c for c in changes if c['mapping'] and c['mapping']['is_active']]
+        removals = [c for c in changes if not (c['mapping'] and c['mapping']['is_active'])]
+        done, failed = [], []
+        
+        # Active mappings go out in bulk imports, which overwrite by stub id
+        if upserts:
+            results = self.wiremock.import_mappings([c['mapping'] for c in upserts], fence=fence)
+            for change, result in zip(upserts, results):
+                if result['success']:
+                    done.append(change)
+                else:
+                    change['error'] = str(result['result'])
+                    failed.append(change)
+        
+        # Deleted and deactivated mappings lose their stub
+        if removals:
+            fence()
+        outcomes = self.wiremock.remove_mapping_stubs([c['wiremock_stub_id'] for c in removals])
+        for change in removals:
+            success, result = outcomes.get(change['wiremock_stub_id'], (True, None))
+            if success:
+                done.append(change)
+            else:
+                change['error'] = result
+                failed.append(change)
+        
+        if done:
+            self.db.complete_sync_changes(done)
+        if failed:
+            now = time.time()
+            for change in failed:
+                change['retry_at'] = now + self._retry_delay(change['attempts'])
+            self.db.fail_sync_changes(failed)
+            self.last_error = failed[-1]['error']
+        
+        self.last_run_at = time.time()
+        return len(changes)
+    
+    def flush(self):
+        """Push everything pending now, without waiting for the debounce; returns how many were handled"""
+        handled = 0
+        while True:
+            processed = self.run_once(settle=False, wait=self.lease_wait)
+            handled += processed
+            # Failed changes are rescheduled for later, so a short batch means nothing is left
+            if processed < self.batch_size:
+                return handled
+    
+    def full_sync(self):
+        """Replace everything in WireMock with the active mappings, returning per-mapping results.
+        
+        Returns None, with last_error set, if another process kept the sync
+        lease or took it over part way through.
+        """
+        with self._lock, self.lease(wait=self.lease_wait) as fence:
+            if fence is None:
+                self.last_error = 'Another process is syncing WireMock'
+                return None
+            try:
+                return self.wiremock.bulk_sync_mappings(self.db.get_all_active_mappings(), fence=fence)
+            except SyncAborted as e:
+                self.last_error = str(e)
+                return None
+    
+    def reconcile(self, wait=None, user_id=None):
+        """Repair drift between SQLite and WireMock now, for everyone or for one user's stubs only"""
+        # Holding the drain lock and the lease keeps a repair from overwriting a newer push
+        if user_id is None:
+            self._next_reconcile_at = time.monotonic() + self.reconcile_interval
+        with self._lock, self.lease(wait=self.lease_wait if wait is None else wait) as fence:
+            if fence is None:
+                return self.reconciler.new_report('Another process is syncing WireMock')
+            try:
+                return self.reconciler.run(fence, user_id)
+            except SyncAborted as e:
+                return self.reconciler.new_report(str(e))
+    
+    def collect_hits(self):
+        """Ingest WireMock's request journal into the per-mapping hit counters now"""
+        # Runs outside the drain lock; it only reads the journal and never touches stubs.
+        # Another process already collecting means there is nothing to do here.
+        with self.lease(JOURNAL_LEASE) as fence:
+            if fence is None:
+                return None
+            try:
+                return self.collector.run(fence)
+            except SyncAborted as e:
+                self.last_error = str(e)
+                return None
+    
+    @staticmethod
+    def _retry_delay(attempts):
+        return min(Config.SYNC_RETRY_BACKOFF * (2 ** attempts), Config.SYNC_RETRY_MAX_BACKOFF)
+    
+    def stats(self):
+        """Queue depth, lag and worker state for the admin dashboard"""
+        stats = self.db.get_sync_outbox_stats()
+        lease = self.db.get_sync_lease(SYNC_LEASE)
+        stats.update({
+            'running': bool(self._thread and self._thread.is_alive()),
+            'last_run_at': self.last_run_at,
+            'last_error': self.last_error,
+            'last_reconcile': self.reconciler.last_report,
+            'last_journal': self.collector.last_report,
+            'lease': lease if lease and lease['expires_at'] > time.time() else None
+        })
+        return stats
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_wiremock import FakeWireMock
+from config import Config
+from database import Database
+from sync_worker import SyncWorker
+from wiremock_service import WireMockService
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / 'mock_server.db'))
+
+@pytest.fixture
+def fake_wiremock():
+    fake = FakeWireMock().start()
+    yield fake
+    fake.stop()
+
+@pytest.fixture
+def wiremock(fake_wiremock):
+    return WireMockService(fake_wiremock.admin_url)
+
+@pytest.fixture
+def portal(db, wiremock, monkeypatch):
+    """The app module, pointed at this test's database and fake WireMock with no background threads"""
+    monkeypatch.setattr(Config, 'DATABASE_PATH', db.db_path)
+    monkeypatch.setattr(Config, 'SYNC_WORKER_ENABLED', False)
+    monkeypatch.setattr(Config, 'HEALTH_CHECK_INTERVAL', 0)
+    monkeypatch.setattr(Config, 'WIREMOCK_EXPORT_DIR', '')
+    import app as portal
+    monkeypatch.setattr(portal, 'db', db)
+    monkeypatch.setattr(portal, 'wiremock', wiremock)
+    monkeypatch.setattr(portal, 'sync_worker', SyncWorker(db, wiremock))
+    return portal
+
+@pytest.fixture
+def client(portal):
+    """A test client logged in as a fresh regular user"""
+    user_id = portal.db.create_user('client', 'client')
+    client = portal.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['username'] = 'client'
+        session['is_admin'] = 0
+    client.user_id = user_id
+    return client
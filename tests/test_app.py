@@ -0,0 +1,66 @@
+import io
+import json
+
+import pytest
+
+def jsonl(records):
+    return ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+
+def test_large_import_is_read_from_a_spooled_file(client, portal):
+    records = [
+        {'name': f'mapping {i}', 'request_method': 'get', 'request_url': f'/items/{i}', 'response_body': 'x' * 200}
+        for i in range(3000)
+    ]
+    data = jsonl(records[:1500]) + b'not json\n\n' + jsonl(records[1500:])
+    # Werkzeug keeps uploads up to 500KB in memory and spools larger ones to disk
+    assert len(data) > 500 * 1024
+    
+    response = client.post('/user/mappings/import', data={'file': (io.BytesIO(data), 'mappings.jsonl')})
+    assert response.status_code == 302
+    assert portal.db.count_active_mappings() == 3000
+    with client.session_transaction() as session:
+        [(category, message)] = session['_flashes']
+    assert category == 'warning'
+    assert message.startswith('Imported 3000 mappings, skipped 1 lines: line 1501:')
+
+def test_import_rejects_files_that_are_not_utf8(client, portal):
+    data = jsonl([{'name': 'ok', 'request_method': 'GET', 'request_url': '/ok'}]) + b'\xff\xfe\n'
+    client.post('/user/mappings/import', data={'file': (io.BytesIO(data), 'mappings.jsonl')})
+    with client.session_transaction() as session:
+        [(category, message)] = session['_flashes']
+    assert message == 'Imported 0 mappings, skipped 1 lines: file is not valid UTF-8'
+
+def test_headers_must_be_strings_or_lists_of_strings(portal):
+    assert portal.validate_headers('{"X-Id": "1", "Vary": ["Accept", "Origin"]}') == {
+        'X-Id': '1', 'Vary': ['Accept', 'Origin']
+    }
+    for headers in ('{"X-Id": 1}', '{"X-Ok": true}', '{"X-Ratio": 0.5}', '{"Vary": ["Accept", 2]}', '{"X": null}',
+                    '["X-Id"]', '{"X-Id": {"nested": "1"}}'):
+        with pytest.raises(ValueError):
+            portal.validate_headers(headers)
+
+def test_mappings_with_bad_headers_are_not_stored(client, portal):
+    response = client.post('/user/mappings/create', data={
+        'name': 'bad', 'request_method': 'GET', 'request_url': '/bad', 'response_headers': '{"X-Id": 1}'
+    })
+    assert response.status_code == 200
+    assert b'Invalid response headers: header &#34;X-Id&#34; must be a string or a list of strings' in response.data
+    
+    records = [
+        {'name': 'bad', 'request_method': 'GET', 'request_url': '/bad', 'response_headers': {'X-Id': 1}},
+        {'name': 'good', 'request_method': 'GET', 'request_url': '/good', 'response_headers': {'X-Id': '1'}},
+    ]
+    client.post('/user/mappings/import', data={'file': (io.BytesIO(jsonl(records)), 'mappings.jsonl')})
+    assert [mapping['name'] for mapping in portal.db.get_user_mappings(client.user_id)] == ['good']
+
+def test_new_api_token_is_shown_once_and_kept_out_of_the_session(client, portal):
+    response = client.post('/user/tokens/create', data={'name': 'ci'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-store'
+    [token] = [line.split('<code>')[1].split('</code>')[0]
+               for line in response.get_data(as_text=True).splitlines() if '<pre' in line]
+    assert portal.db.get_user_by_api_token(token)['id'] == client.user_id
+    
+    with client.session_transaction() as session:
+        assert token not in str(dict(session))
+    assert token not in client.get('/user').get_data(as_text=True)
@@ -0,0 +1,100 @@
+import pytest
+
+from config import Config
+from database import Database
+from mock_engine import MockEngine
+
+@pytest.fixture(autouse=True)
+def poll_every_lookup(monkeypatch):
+    monkeypatch.setattr(Config, 'CHANGE_POLL_INTERVAL', 0)
+
+@pytest.fixture
+def statements(monkeypatch):
+    """Collect every SQL statement run by connections opened from now on"""
+    executed = []
+    connect = Database._connect
+    def traced_connect(self):
+        conn = connect(self)
+        conn.set_trace_callback(executed.append)
+        return conn
+    monkeypatch.setattr(Database, '_connect', traced_connect)
+    return executed
+
+def test_user_changes_reach_other_instances(db):
+    other = Database(db.db_path)
+    user_id = db.create_user('shared', 'shared', is_admin=True)
+    assert other.get_user_by_id(user_id)['is_admin'] == 1
+    
+    db.update_user(user_id, is_admin=False)
+    assert other.get_user_by_id(user_id)['is_admin'] == 0
+    
+    db.delete_user(user_id)
+    assert other.get_user_by_id(user_id) is None
+
+def test_mapping_changes_reach_other_engines(db):
+    other = Database(db.db_path)
+    engine = MockEngine(other)
+    user_id = db.create_user('shared', 'shared')
+    assert engine.match('GET', '/shared') is None
+    
+    mapping_id = db.create_mapping(user_id, 'shared', 'GET', '/shared', 200, 'first')
+    assert engine.match('GET', '/shared')[3] == 'first'
+    
+    db.update_mapping(mapping_id, user_id, response_body='second')
+    assert engine.match('GET', '/shared')[3] == 'second'
+    
+    db.set_mappings_active(user_id, [mapping_id], False)
+    assert engine.match('GET', '/shared') is None
+    
+    db.set_mappings_active(user_id, [mapping_id], True)
+    db.delete_mapping(mapping_id, user_id)
+    assert engine.match('GET', '/shared') is None
+
+def test_own_changes_are_not_applied_twice(db):
+    refreshed = []
+    db.add_mapping_listener(refreshed.append)
+    user_id = db.create_user('own', 'own')
+    mapping_id = db.create_mapping(user_id, 'own', 'GET', '/own', 200, 'body')
+    db.poll_changes()
+    assert refreshed == [[mapping_id]]
+
+def test_trimmed_log_reloads_everything(db, monkeypatch):
+    other = Database(db.db_path)
+    engine = MockEngine(other)
+    user_id = db.create_user('shared', 'shared')
+    assert engine.match('GET', '/0') is None
+    
+    monkeypatch.setattr(Config, 'CHANGE_LOG_SIZE', 2)
+    db.create_mappings(user_id, [
+        {'name': str(i), 'request_method': 'GET', 'request_url': f'/{i}', 'response_body': str(i)} for i in range(5)
+    ])
+    assert engine.match('GET', '/0')[3] == '0'
+    assert engine.match('GET', '/4')[3] == '4'
+
+def test_cache_hits_skip_the_database_between_polls(db, statements, monkeypatch):
+    user_id = db.create_user('cached', 'cached')
+    other = Database(db.db_path)
+    engine = MockEngine(other)
+    db.create_mapping(user_id, 'cached', 'GET', '/cached', 200, 'body')
+    monkeypatch.setattr(Config, 'CHANGE_POLL_INTERVAL', 60)
+    assert other.get_user_by_id(user_id)['username'] == 'cached'
+    assert engine.match('GET', '/cached')[3] == 'body'
+    
+    del statements[:]
+    for _ in range(10):
+        assert other.get_user_by_id(user_id)['username'] == 'cached'
+        assert engine.match('GET', '/cached')[3] == 'body'
+    assert statements == []
+
+def test_unchanged_database_skips_the_change_log(db, statements):
+    other = Database(db.db_path)
+    user_id = db.create_user('cached', 'cached')
+    assert other.get_user_by_id(user_id)['username'] == 'cached'
+    
+    del statements[:]
+    for _ in range(10):
+        assert other.get_user_by_id(user_id)['username'] == 'cached'
+    assert statements == ['PRAGMA data_version'] * 10
+    
+    db.update_user(user_id, is_admin=True)
+    assert other.get_user_by_id(user_id)['is_admin'] == 1
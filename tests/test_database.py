@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from config import Config
+from database import Database
+
+def test_connections_use_wal_and_the_configured_pragmas(db):
+    with db.get_connection() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1
+        assert conn.execute('PRAGMA cache_size').fetchone()[0] == -Config.DATABASE_CACHE_SIZE_KB
+        assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == Config.DATABASE_BUSY_TIMEOUT_MS
+
+def test_connections_are_reused(db):
+    with db.get_connection() as first:
+        pass
+    with db.get_connection() as second:
+        pass
+    assert first is second
+    
+    # A forked child must not use the parent's connections
+    db._pool_pid = -1
+    with db.get_connection() as third:
+        pass
+    assert third is not first
+
+def test_nested_calls_share_the_outer_transaction(db):
+    with pytest.raises(RuntimeError):
+        with db.get_connection() as outer:
+            db.create_user('nested', 'nested')
+            with db.get_connection() as inner:
+                assert inner is outer
+            raise RuntimeError
+    assert db.verify_user('nested', 'nested') is None
+    
+    with db.get_connection():
+        user_id = db.create_user('nested', 'nested')
+        db.update_user(user_id, is_admin=True)
+    assert db.verify_user('nested', 'nested')['is_admin'] == 1
+
+def test_readers_are_not_blocked_by_a_writer(db):
+    user_id = db.create_user('reader', 'reader')
+    writing = threading.Event()
+    done = threading.Event()
+    
+    def write():
+        with db.get_connection() as conn:
+            conn.execute('UPDATE users SET is_admin = 1 WHERE id = ?', (user_id,))
+            writing.set()
+            done.wait(5)
+    
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        assert writing.wait(5)
+        other = Database(db.db_path)
+        # The uncommitted write is invisible, and reading doesn't wait for it
+        assert other.get_user_by_id(user_id)['is_admin'] == 0
+    finally:
+        done.set()
+        writer.join()
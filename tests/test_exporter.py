@@ -0,0 +1,42 @@
+import os
+
+from exporter import StubExporter, export_once
+
+def exported(root_dir):
+    return {
+        directory: sorted(os.listdir(os.path.join(root_dir, directory))) for directory in ('mappings', '__files')
+    }
+
+def test_workers_refresh_without_deleting_other_files(db, wiremock, tmp_path):
+    root_dir = str(tmp_path / 'export')
+    user_id = db.create_user('export', 'export')
+    kept = db.create_mapping(user_id, 'kept', 'GET', '/kept', 200, 'kept')
+    
+    first = StubExporter(db, wiremock, root_dir)
+    # Written by another worker, for a mapping this one has not seen yet
+    with open(os.path.join(root_dir, 'mappings', 'mapping-999.json'), 'w') as f:
+        f.write('{}')
+    StubExporter(db, wiremock, root_dir)
+    assert exported(root_dir)['mappings'] == ['mapping-999.json']
+    
+    db.update_mapping(kept, user_id, response_body='changed')
+    assert exported(root_dir)['mappings'] == [f'mapping-{kept}.json', 'mapping-999.json']
+    assert first.last_error is None
+
+def test_export_once_rebuilds_the_directory(db, tmp_path, monkeypatch):
+    root_dir = str(tmp_path / 'export')
+    monkeypatch.setattr('config.Config.DATABASE_PATH', db.db_path)
+    user_id = db.create_user('export', 'export')
+    active, inactive = db.create_mappings(user_id, [
+        {'name': name, 'request_method': 'GET', 'request_url': f'/{name}', 'response_body': name}
+        for name in ('active', 'inactive')
+    ])
+    db.set_mappings_active(user_id, [inactive], False)
+    os.makedirs(os.path.join(root_dir, 'mappings'))
+    with open(os.path.join(root_dir, 'mappings', 'mapping-999.json'), 'w') as f:
+        f.write('{}')
+    
+    assert export_once(root_dir) == 1
+    files = exported(root_dir)
+    assert files['mappings'] == [f'mapping-{active}.json']
+    assert files['__files'] == [db.get_mapping_by_id(active)['response_body_hash']]
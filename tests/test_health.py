@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from health import HealthMonitor
+from sync_worker import SyncWorker
+from wiremock_service import CircuitBreaker, CircuitOpenError
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    breaker.record_failure()
+    assert (breaker.state, breaker.allow()) == (CircuitBreaker.CLOSED, True)
+    breaker.record_failure()
+    assert (breaker.state, breaker.blocked, breaker.allow()) == (CircuitBreaker.OPEN, True, False)
+    
+    # After the reset timeout a single trial call goes through
+    time.sleep(0.15)
+    assert not breaker.blocked
+    assert breaker.allow()
+    assert (breaker.state, breaker.blocked, breaker.allow()) == (CircuitBreaker.HALF_OPEN, True, False)
+    # A failed trial opens the circuit again at once
+    breaker.record_failure()
+    assert (breaker.state, breaker.allow()) == (CircuitBreaker.OPEN, False)
+    
+    time.sleep(0.15)
+    assert breaker.allow()
+    breaker.record_success()
+    assert (breaker.state, breaker.failures, breaker.allow()) == (CircuitBreaker.CLOSED, 0, True)
+
+def test_open_circuit_fails_calls_without_contacting_the_node(fake_wiremock, wiremock):
+    node, = wiremock.nodes
+    node.breaker.trip()
+    with pytest.raises(CircuitOpenError):
+        node._request('GET', '/mappings')
+    assert not wiremock.test_connection()
+    assert not wiremock.available()
+    assert fake_wiremock.calls == {}
+
+def test_monitor_caches_probes_and_drives_the_circuit(fake_wiremock, wiremock):
+    node, = wiremock.nodes
+    monitor = HealthMonitor(wiremock)
+    monitor.interval = 60
+    monitor.start()
+    try:
+        deadline = time.monotonic() + 5
+        while monitor.last_checked_at is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        [health] = monitor.node_health()
+        assert (health['online'], health['circuit'], health['probe_error']) == (True, CircuitBreaker.CLOSED, None)
+        assert monitor.node_health() == [health]
+        assert fake_wiremock.calls == {'GET /__admin/mappings': 1}
+    finally:
+        monitor.stop()
+    
+    admin_url = node.base_url
+    node.base_url = 'http://127.0.0.1:9/__admin'
+    [health] = monitor.check().values()
+    assert not health['online'] and health['probe_error'].startswith('Error connecting to WireMock')
+    assert node.breaker.state == CircuitBreaker.OPEN
+    
+    node.base_url = admin_url
+    monitor.check()
+    assert node.breaker.state == CircuitBreaker.CLOSED
+
+def test_changes_wait_in_the_outbox_while_every_circuit_is_open(db, fake_wiremock, wiremock):
+    worker = SyncWorker(db, wiremock)
+    user_id = db.create_user('health', 'health')
+    db.create_mapping(user_id, 'health', 'GET', '/health', 200, 'body')
+    wiremock.nodes[0].breaker.trip()
+    
+    assert worker.run_once(settle=False) == 0
+    assert worker.last_error.startswith('WireMock is unavailable')
+    stats = db.get_sync_outbox_stats()
+    assert (stats['depth'], stats['failing']) == (1, 0)
+    
+    wiremock.nodes[0].breaker.record_success()
+    assert worker.run_once(settle=False) == 1
+    assert len(fake_wiremock.stubs) == 1
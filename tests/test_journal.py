@@ -0,0 +1,66 @@
+import time
+
+from journal import JournalCollector
+
+def create_mappings(db, count):
+    user_id = db.create_user('journal', 'journal')
+    mapping_ids = [
+        db.create_mapping(user_id, f'm{i}', 'GET', f'/journal/{i}', 200, '{}', None, 5) for i in range(count)
+    ]
+    return db.get_mappings_by_ids(mapping_ids)
+
+def test_hits_are_counted_and_trimmed(db, fake_wiremock, wiremock):
+    first, second = create_mappings(db, 2)
+    now = int(time.time() * 1000)
+    for i in range(3):
+        fake_wiremock.log_request(first['wiremock_stub_id'], logged_at_ms=now + i)
+    fake_wiremock.log_request(second['wiremock_stub_id'], logged_at_ms=now + 3)
+    fake_wiremock.log_request(None, logged_at_ms=now + 4)
+    
+    report = JournalCollector(db, wiremock).run()
+    
+    assert (report['ingested'], report['attributed'], report['error']) == (5, 4, None)
+    assert fake_wiremock.journal == []
+    totals = db.get_mapping_hit_totals([first['id'], second['id']])
+    assert (totals[first['id']]['hits'], totals[second['id']]['hits']) == (3, 1)
+
+def test_pass_stops_at_max_entries(db, fake_wiremock, wiremock):
+    mapping, = create_mappings(db, 1)
+    now = int(time.time() * 1000)
+    for i in range(25):
+        fake_wiremock.log_request(mapping['wiremock_stub_id'], url=f'/journal/{i}', logged_at_ms=now + i)
+    collector = JournalCollector(db, wiremock)
+    collector.page_size = 4
+    collector.max_entries = 10
+    
+    report = collector.run()
+    assert (report['ingested'], report['backlog']) == (10, True)
+    assert len(fake_wiremock.journal) == 15
+    assert fake_wiremock.calls['POST /__admin/requests/remove'] == 10
+    
+    reports = [collector.run(), collector.run()]
+    assert [r['ingested'] for r in reports] == [10, 5]
+    assert reports[-1]['backlog'] is False
+    assert fake_wiremock.journal == []
+    assert db.get_mapping_hit_totals([mapping['id']])[mapping['id']]['hits'] == 25
+    
+    fake_wiremock.log_request(mapping['wiremock_stub_id'], logged_at_ms=now + 100)
+    assert collector.run()['ingested'] == 1
+    assert db.get_mapping_hit_totals([mapping['id']])[mapping['id']]['hits'] == 26
+
+def test_repeated_requests_are_removed_in_bulk(db, fake_wiremock, wiremock):
+    mappings = create_mappings(db, 3)
+    now = int(time.time() * 1000)
+    for i in range(300):
+        mapping = mappings[i % 3]
+        fake_wiremock.log_request(mapping['wiremock_stub_id'], url=mapping['request_url'], logged_at_ms=now + i)
+    collector = JournalCollector(db, wiremock)
+    collector.page_size = 50
+    
+    fake_wiremock.reset_counters()
+    report = collector.run()
+    assert (report['ingested'], report['attributed'], report['backlog']) == (300, 300, False)
+    assert fake_wiremock.calls == {'GET /__admin/requests': 2, 'POST /__admin/requests/remove': 3}
+    assert fake_wiremock.journal == []
+    totals = db.get_mapping_hit_totals([mapping['id'] for mapping in mappings])
+    assert [totals[mapping['id']]['hits'] for mapping in mappings] == [100, 100, 100]
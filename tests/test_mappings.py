@@ -0,0 +1,96 @@
+def blob_hashes(db):
+    with db.get_connection() as conn:
+        return {row[0] for row in conn.execute('SELECT hash FROM response_blobs')}
+
+def mapping_hashes(db):
+    with db.get_connection() as conn:
+        return {row[0] for row in conn.execute('SELECT response_body_hash FROM mock_mappings') if row[0]}
+
+def test_repeated_updates_in_a_batch_apply_in_order(db):
+    user_id = db.create_user('batch', 'batch')
+    mapping_id = db.create_mapping(user_id, 'batch', 'GET', '/batch', 200, 'original')
+    
+    assert db.update_mappings(user_id, [
+        {'id': mapping_id, 'name': 'first', 'response_body': 'first'},
+        {'id': mapping_id, 'name': 'second', 'priority': 5, 'response_body': 'second'},
+        {'id': mapping_id, 'name': 'third'},
+    ]) == [True, True, True]
+    
+    mapping = db.get_mapping_by_id(mapping_id)
+    assert (mapping['name'], mapping['priority'], mapping['response_body']) == ('third', 5, 'second')
+    assert blob_hashes(db) == mapping_hashes(db)
+
+def test_shared_bodies_are_kept_until_unused(db):
+    user_id = db.create_user('batch', 'batch')
+    first, second = db.create_mappings(user_id, [
+        {'name': name, 'request_method': 'GET', 'request_url': f'/{name}', 'response_body': 'shared'}
+        for name in ('first', 'second')
+    ])
+    
+    db.update_mappings(user_id, [{'id': first, 'response_body': 'own'}])
+    assert db.get_mapping_by_id(second)['response_body'] == 'shared'
+    assert blob_hashes(db) == mapping_hashes(db)
+    
+    db.delete_mappings(user_id, [first, second])
+    assert blob_hashes(db) == set()
+
+def walk(fetch):
+    pages, after = [], None
+    while True:
+        rows, after = fetch(after)
+        pages.append([row['id'] for row in rows])
+        if after is None:
+            return pages
+
+def test_listings_are_paged_by_keyset_without_bodies(db):
+    user_id = db.create_user('pages', 'pages')
+    # Created in one transaction, so every row shares a created_at and only the id orders them
+    mapping_ids = db.create_mappings(user_id, [
+        {'name': str(i), 'request_method': 'POST' if i % 2 else 'GET', 'request_url': f'/{i}', 'response_body': 'x'}
+        for i in range(7)
+    ])
+    
+    newest = walk(lambda after: db.get_user_mappings_page(user_id, 3, after=after))
+    assert newest == [mapping_ids[:3:-1], mapping_ids[3:0:-1], mapping_ids[:1]]
+    oldest = walk(lambda after: db.get_user_mappings_page(user_id, 3, after=after, newest_first=False))
+    assert oldest == [mapping_ids[:3], mapping_ids[3:6], mapping_ids[6:]]
+    posts = walk(lambda after: db.get_user_mappings_page(user_id, 2, after=after, request_method='POST'))
+    assert posts == [mapping_ids[5:2:-2], mapping_ids[1:2]]
+    
+    rows, _ = db.get_user_mappings_page(user_id, 1)
+    assert 'response_body' not in rows[0] and 'response_body_hash' not in rows[0]
+
+def test_dashboard_pages_follow_the_cursor(client, portal, monkeypatch):
+    monkeypatch.setattr(portal.Config, 'PAGE_SIZE', 2)
+    mapping_ids = portal.db.create_mappings(client.user_id, [
+        {'name': f'listed-{i}', 'request_method': 'GET', 'request_url': f'/{i}'} for i in range(3)
+    ])
+    first = client.get('/user').get_data(as_text=True)
+    assert 'listed-2' in first and 'listed-1' in first and 'listed-0' not in first
+    
+    _, after = portal.db.get_user_mappings_page(client.user_id, 2)
+    assert after[1] == mapping_ids[1]
+    second = client.get('/user', query_string={'after': portal.encode_cursor(after)}).get_data(as_text=True)
+    assert 'listed-0' in second and 'listed-1' not in second
+
+def test_bodies_are_stored_once_and_compressed_when_large(db, monkeypatch):
+    monkeypatch.setattr('config.Config.BODY_COMPRESSION_THRESHOLD', 100)
+    user_id = db.create_user('bodies', 'bodies')
+    other_id = db.create_user('others', 'others')
+    large = '{"items": [' + ', '.join('{"id": 1}' for _ in range(200)) + ']}'
+    mapping_ids = [
+        db.create_mapping(owner, name, 'GET', f'/{name}', 200, body)
+        for owner, name, body in ((user_id, 'a', large), (other_id, 'b', large), (user_id, 'c', 'small'),
+                                  (user_id, 'd', ''))
+    ]
+    
+    with db.get_connection() as conn:
+        blobs = {row['size']: row for row in conn.execute('SELECT * FROM response_blobs')}
+    assert sorted(blobs) == [len('small'), len(large)]
+    assert blobs[len(large)]['compressed'] == 1 and len(blobs[len(large)]['data']) < len(large) / 10
+    assert blobs[len('small')]['compressed'] == 0
+    
+    assert [db.get_mapping_by_id(mapping_id)['response_body'] for mapping_id in mapping_ids] == [
+        large, large, 'small', ''
+    ]
+    assert sorted(mapping['response_body'] for mapping in db.get_all_active_mappings()) == sorted(['', 'small', large, large])
@@ -0,0 +1,47 @@
+import pytest
+
+import metrics
+
+def sample(text, line_start):
+    [value] = [line.rsplit(' ', 1)[1] for line in text.splitlines() if line.startswith(line_start)]
+    return float(value)
+
+def test_histograms_render_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = registry.histogram('test_seconds', 'Test latency', ('route',), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, route='/a "b"')
+    registry.gauge('test_live', 'Computed at render time', function=lambda: 7)
+    
+    assert registry.render().splitlines() == [
+        '# HELP test_seconds Test latency',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{route="/a \\"b\\"",le="0.1"} 2',
+        'test_seconds_bucket{route="/a \\"b\\"",le="1.0"} 3',
+        'test_seconds_bucket{route="/a \\"b\\"",le="+Inf"} 4',
+        'test_seconds_sum{route="/a \\"b\\""} 3.65',
+        'test_seconds_count{route="/a \\"b\\""} 4',
+        '# HELP test_live Computed at render time',
+        '# TYPE test_live gauge',
+        'test_live 7',
+    ]
+
+def test_routes_database_and_wiremock_calls_are_timed(client, portal, db):
+    before = metrics.REGISTRY.render()
+    assert client.get('/user').status_code == 200
+    assert portal.sync_worker.flush() == 0
+    assert portal.wiremock.test_connection()
+    
+    after = client.get('/metrics').get_data(as_text=True)
+    for prefix in (
+        'mockpoc_http_request_duration_seconds_count{endpoint="user_dashboard",method="GET",status="200"}',
+        'mockpoc_template_render_duration_seconds_count{template="user/dashboard.html"}',
+        'mockpoc_db_call_duration_seconds_count{method="get_user_mappings_page"}',
+        f'mockpoc_wiremock_request_duration_seconds_count{{node="{portal.wiremock.base_url}",method="GET",'
+        f'path="/mappings",status="200"}}',
+    ):
+        assert sample(after, prefix) == (sample(before, prefix) if prefix in before else 0) + 1
+    
+    with pytest.raises(TypeError):
+        db.get_user_by_id()
+    assert 'mockpoc_db_call_errors_total{method="get_user_by_id"}' in metrics.REGISTRY.render()
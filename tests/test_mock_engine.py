@@ -0,0 +1,55 @@
+from mock_engine import MockEngine, RouteIndex
+
+def route(mapping_id, method, url, priority=5, body=''):
+    return {'id': mapping_id, 'request_method': method, 'request_url': url, 'priority': priority,
+            'response_status': 200, 'response_headers': None, 'response_body': body}
+
+def test_routes_follow_wiremock_matching_rules():
+    index = RouteIndex()
+    index.rebuild([
+        route(1, 'GET', '/users/1', priority=5),
+        route(2, 'GET', '/users/1', priority=1),
+        route(3, 'ANY', '/users/1', priority=1),
+        route(4, 'POST', '/users'),
+    ])
+    # Lower priority numbers win, and ties go to the most recently added stub
+    assert index.match('get', '/users/1')[0] == 3
+    assert index.match('DELETE', '/users/1')[0] == 3
+    assert index.match('POST', '/users')[0] == 4
+    assert index.match('GET', '/users') is None
+    assert index.match('GET', '/users/1/') is None
+    
+    index.remove(3)
+    assert index.match('GET', '/users/1')[0] == 2
+    index.upsert(route(1, 'GET', '/users/1', priority=1))
+    assert index.match('GET', '/users/1')[0] == 1
+    assert len(index) == 3
+
+def test_engine_follows_mapping_changes(db):
+    engine = MockEngine(db)
+    user_id = db.create_user('engine', 'engine')
+    assert engine.match('GET', '/engine') is None
+    
+    mapping_id = db.create_mapping(user_id, 'engine', 'GET', '/engine', 201, '{"ok": true}',
+                                   '{"Content-Type": "application/json"}')
+    assert engine.match('GET', '/engine') == (mapping_id, 201, {'Content-Type': 'application/json'}, '{"ok": true}')
+    
+    db.update_mapping(mapping_id, user_id, request_url='/moved')
+    assert engine.match('GET', '/engine') is None
+    assert engine.match('GET', '/moved')[0] == mapping_id
+    
+    db.set_mappings_active(user_id, [mapping_id], False)
+    assert engine.match('GET', '/moved') is None
+
+def test_served_responses_carry_only_the_mapping_headers(portal, db, monkeypatch):
+    monkeypatch.setattr(portal, 'mock_engine', MockEngine(db))
+    user_id = db.create_user('engine', 'engine')
+    db.create_mapping(user_id, 'plain', 'GET', '/plain', 202, 'plain body')
+    
+    with portal.app.test_request_context('/mock/plain?ignored=1'):
+        response = portal.serve_mock('plain')
+    assert (response.status_code, response.get_data(as_text=True)) == (202, 'plain body')
+    assert 'Content-Type' not in response.headers
+    
+    with portal.app.test_request_context('/mock/missing', method='POST'):
+        assert portal.serve_mock('missing').status_code == 404
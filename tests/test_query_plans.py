@@ -0,0 +1,9 @@
+def test_hot_queries_use_indexes(db):
+    assert db.check_query_plans() == {}
+
+def test_full_index_scans_are_reported(db):
+    db.HOT_QUERIES = {
+        **db.HOT_QUERIES,
+        'scan_by_index': ('SELECT id FROM mock_mappings ORDER BY user_id, created_at', ()),
+    }
+    assert list(db.check_query_plans()) == ['scan_by_index']
@@ -0,0 +1,88 @@
+import requests
+
+from reconciler import Reconciler
+
+def create_synced_mappings(db, wiremock, count, user_id=None):
+    user_id = user_id or db.create_user('drift', 'drift')
+    mapping_ids = [
+        db.create_mapping(user_id, f'm{i}', 'GET', f'/drift/{user_id}/{i}', 200, f'{{"i": {i}}}',
+                          '{"Content-Type": "application/json"}', 5)
+        for i in range(count)
+    ]
+    mappings = db.get_mappings_by_ids(mapping_ids)
+    assert all(result['success'] for result in wiremock.import_mappings(mappings))
+    return mappings
+
+def test_synced_stubs_show_no_drift(db, fake_wiremock, wiremock):
+    create_synced_mappings(db, wiremock, 3)
+    report = Reconciler(db, wiremock).run()
+    assert (report['drift'], report['error']) == (0, None)
+
+def test_stub_changed_through_the_admin_api_is_repaired(db, fake_wiremock, wiremock):
+    mapping, untouched = create_synced_mappings(db, wiremock, 2)
+    stub_url = f"{fake_wiremock.admin_url}/mappings/{mapping['wiremock_stub_id']}"
+    tampered = dict(requests.get(stub_url).json())
+    tampered['response'] = dict(tampered['response'], status=500, body='TAMPERED')
+    requests.put(stub_url, json=tampered).raise_for_status()
+    
+    report = Reconciler(db, wiremock).run()
+    assert (report['stale'], report['repaired'], report['drift']) == (1, 1, 1)
+    restored = requests.get(stub_url).json()['response']
+    assert (restored['status'], restored['body']) == (200, mapping['response_body'])
+    assert Reconciler(db, wiremock).run()['drift'] == 0
+
+def test_extra_response_fields_count_as_drift(db, fake_wiremock, wiremock):
+    mapping, = create_synced_mappings(db, wiremock, 1)
+    stub = fake_wiremock.stubs[mapping['wiremock_stub_id']]
+    stub['response']['fixedDelayMilliseconds'] = 5000
+    
+    assert Reconciler(db, wiremock).run()['stale'] == 1
+    assert 'fixedDelayMilliseconds' not in fake_wiremock.stubs[mapping['wiremock_stub_id']]['response']
+
+def test_exported_stubs_match_by_body_file(db, fake_wiremock, wiremock):
+    mapping, = create_synced_mappings(db, wiremock, 1)
+    stub = fake_wiremock.stubs[mapping['wiremock_stub_id']]
+    del stub['response']['body']
+    stub['response']['bodyFileName'] = mapping['response_body_hash']
+    
+    assert Reconciler(db, wiremock).run()['drift'] == 0
+
+def test_user_resync_repairs_only_that_users_stubs(client, portal, fake_wiremock):
+    own = create_synced_mappings(portal.db, portal.wiremock, 3, user_id=client.user_id)
+    other = create_synced_mappings(portal.db, portal.wiremock, 2)
+    del fake_wiremock.stubs[own[0]['wiremock_stub_id']]
+    fake_wiremock.stubs[own[1]['wiremock_stub_id']]['response']['status'] = 500
+    fake_wiremock.stubs[other[0]['wiremock_stub_id']]['response']['status'] = 500
+    orphan = {'id': 'orphan', 'request': {'method': 'GET', 'urlPath': '/orphan'}, 'response': {'status': 200},
+              'metadata': {'mockPoc': {'userId': client.user_id}}}
+    fake_wiremock.stubs['orphan'] = orphan
+    untagged = {'id': 'untagged', 'request': {'method': 'GET', 'urlPath': '/untagged'}, 'response': {'status': 200}}
+    fake_wiremock.stubs['untagged'] = untagged
+    fake_wiremock.reset_counters()
+    
+    client.post('/user/resync-wiremock')
+    assert 'GET /__admin/mappings' not in fake_wiremock.calls
+    assert 'POST /__admin/mappings/reset' not in fake_wiremock.calls
+    for mapping in own:
+        assert fake_wiremock.stubs[mapping['wiremock_stub_id']]['response']['status'] == 200
+    assert 'orphan' not in fake_wiremock.stubs
+    # Other users' stubs and stubs this app never tagged are left as they are
+    assert fake_wiremock.stubs[other[0]['wiremock_stub_id']]['response']['status'] == 500
+    assert fake_wiremock.stubs['untagged'] == untagged
+    with client.session_transaction() as session:
+        [(category, message)] = session['_flashes']
+    assert category == 'success'
+
+def test_user_without_mappings_loses_their_stubs_in_one_call(db, fake_wiremock, wiremock):
+    mappings = create_synced_mappings(db, wiremock, 3)
+    user_id = mappings[0]['user_id']
+    kept, = create_synced_mappings(db, wiremock, 1, user_id=db.create_user('kept', 'kept'))
+    db.delete_mappings(user_id, [mapping['id'] for mapping in mappings])
+    fake_wiremock.reset_counters()
+    
+    report = Reconciler(db, wiremock).run(user_id=user_id)
+    assert (report['orphaned'], report['repaired']) == (3, 3)
+    assert fake_wiremock.calls == {
+        'POST /__admin/mappings/find-by-metadata': 1, 'POST /__admin/mappings/remove-by-metadata': 1
+    }
+    assert list(fake_wiremock.stubs) == [kept['wiremock_stub_id']]
@@ -0,0 +1,84 @@
+import sqlite3
+
+from database import Database
+
+def create_user_mappings(db, bodies):
+    user_id = db.create_user('search', 'search')
+    mapping_ids = db.create_mappings(user_id, [{
+        'name': f'mapping {i}', 'request_method': 'GET', 'request_url': f'/v2/items/{i}', 'response_body': body
+    } for i, body in enumerate(bodies)])
+    return user_id, mapping_ids
+
+def found(db, query):
+    return [mapping['id'] for mapping in db.search_mappings(query)]
+
+def check_indexes(db):
+    with db.get_connection() as conn:
+        for index in ('mapping_search', 'mapping_body_search'):
+            conn.execute(f"INSERT INTO {index} ({index}, rank) VALUES ('integrity-check', 0)")
+
+def test_names_urls_and_bodies_are_searchable(db):
+    user_id, (plain, compressed, empty) = create_user_mappings(db, ['{"status": "refunded"}', 'pending ' * 200, ''])
+    
+    assert found(db, 'items/1') == [compressed]
+    assert found(db, 'refund') == [plain]
+    assert found(db, 'pending') == [compressed]
+    assert found(db, 'mapping') == [empty, compressed, plain]
+    
+    db.update_mapping(plain, user_id, name='renamed', response_body='{"status": "settled"}')
+    db.update_mappings(user_id, [
+        {'id': compressed, 'response_body': 'first'}, {'id': compressed, 'response_body': 'second'}
+    ])
+    assert found(db, 'refund') == []
+    assert found(db, 'settled') == [plain]
+    assert found(db, 'renamed') == [plain]
+    assert found(db, 'first') == []
+    assert found(db, 'second') == [compressed]
+    
+    db.delete_mapping(plain, user_id)
+    db.delete_mappings(user_id, [compressed])
+    assert found(db, 'settled') == found(db, 'second') == []
+    assert found(db, 'mapping') == [empty]
+    check_indexes(db)
+
+def test_other_sqlite_clients_can_write_mappings(db):
+    user_id, (mapping_id,) = create_user_mappings(db, ['{"status": "refunded"}'])
+    
+    # No application functions are registered on this connection
+    conn = sqlite3.connect(db.db_path)
+    with conn:
+        conn.execute("UPDATE mock_mappings SET name = 'edited' WHERE id = ?", (mapping_id,))
+        conn.execute('UPDATE mock_mappings SET response_status = 500 WHERE id = ?', (mapping_id,))
+    conn.close()
+    assert found(db, 'edited') == [mapping_id]
+    
+    conn = sqlite3.connect(db.db_path)
+    with conn:
+        conn.execute('DELETE FROM mock_mappings WHERE id = ?', (mapping_id,))
+    conn.close()
+    assert found(db, 'edited') == found(db, 'refunded') == []
+    check_indexes(db)
+
+def test_function_triggers_are_replaced_on_upgrade(db):
+    _, (mapping_id,) = create_user_mappings(db, ['{"status": "refunded"}'])
+    # Recreate the first version of the index, whose triggers needed body_text()
+    with db.get_connection() as conn:
+        conn.execute('DROP TABLE mapping_search')
+        conn.execute('DROP TABLE mapping_body_search')
+        conn.execute("CREATE VIRTUAL TABLE mapping_search USING fts5(name, request_url, body, content='')")
+        conn.execute('DROP TRIGGER mock_mappings_search_insert')
+        conn.execute('''
+            CREATE TRIGGER mock_mappings_search_insert AFTER INSERT ON mock_mappings BEGIN
+            INSERT INTO mapping_search (rowid, name, request_url, body)
+            VALUES (new.id, new.name, new.request_url, body_text(NULL, 0)); END
+        ''')
+        conn.execute('PRAGMA user_version = 9')
+    db.close()
+    
+    upgraded = Database(db.db_path)
+    with upgraded.get_connection() as conn:
+        triggers = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+    assert not any('body_text' in row['sql'] for row in triggers)
+    assert found(upgraded, 'refunded') == [mapping_id]
+    assert found(upgraded, 'items') == [mapping_id]
+    check_indexes(upgraded)
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from sync_worker import SYNC_LEASE, SyncAborted, SyncWorker
+
+def test_lease_is_exclusive_until_released(db):
+    generation = db.acquire_sync_lease(SYNC_LEASE, 'a', 30)
+    assert generation == 1
+    assert db.acquire_sync_lease(SYNC_LEASE, 'b', 30) is None
+    assert db.renew_sync_lease(SYNC_LEASE, generation, 30)
+    
+    db.release_sync_lease(SYNC_LEASE, generation)
+    assert db.acquire_sync_lease(SYNC_LEASE, 'b', 30) == 2
+    assert db.get_sync_lease(SYNC_LEASE)['holder'] == 'b'
+
+def test_expired_lease_is_taken_over(db):
+    generation = db.acquire_sync_lease(SYNC_LEASE, 'a', 0.05)
+    time.sleep(0.1)
+    assert db.acquire_sync_lease(SYNC_LEASE, 'b', 30) == generation + 1
+    # The old holder can neither renew nor release the new holder's lease
+    assert not db.renew_sync_lease(SYNC_LEASE, generation, 30)
+    db.release_sync_lease(SYNC_LEASE, generation)
+    assert db.get_sync_lease(SYNC_LEASE)['expires_at'] > time.time()
+
+def test_fence_aborts_after_takeover(db, wiremock):
+    worker = SyncWorker(db, wiremock)
+    worker.lease_ttl = 0.05
+    with worker.lease() as fence:
+        fence()
+        with worker.lease() as second:
+            assert second is None
+        time.sleep(0.1)
+        assert db.acquire_sync_lease(SYNC_LEASE, 'other', 30) is not None
+        with pytest.raises(SyncAborted):
+            fence()
+
+def test_push_without_the_lease_keeps_changes_queued(db, fake_wiremock, wiremock):
+    worker = SyncWorker(db, wiremock)
+    user_id = db.create_user('lease', 'lease')
+    db.create_mapping(user_id, 'lease', 'GET', '/lease', 200, 'body')
+    db.acquire_sync_lease(SYNC_LEASE, 'other', 30)
+    
+    assert worker.run_once(settle=False) == 0
+    assert db.get_sync_outbox_stats()['depth'] == 1
+    assert fake_wiremock.stubs == {}
+    
+    db.release_sync_lease(SYNC_LEASE, 1)
+    assert worker.run_once(settle=False) == 1
+    assert db.get_sync_outbox_stats()['depth'] == 0
+    assert len(fake_wiremock.stubs) == 1
@@ -0,0 +1,107 @@
+import time
+
+from config import Config
+from sync_worker import SyncWorker
+
+def outbox(db):
+    with db.get_connection() as conn:
+        return [dict(row) for row in conn.execute('SELECT * FROM sync_outbox ORDER BY mapping_id')]
+
+def test_edits_to_one_mapping_coalesce_into_one_push(db, fake_wiremock, wiremock):
+    worker = SyncWorker(db, wiremock)
+    user_id = db.create_user('outbox', 'outbox')
+    mapping_id = db.create_mapping(user_id, 'outbox', 'GET', '/outbox', 200, 'first')
+    db.update_mapping(mapping_id, user_id, response_body='second')
+    db.update_mapping(mapping_id, user_id, response_body='third')
+    [change] = outbox(db)
+    assert (change['mapping_id'], change['version']) == (mapping_id, 3)
+    
+    fake_wiremock.reset_counters()
+    assert worker.flush() == 1
+    assert sum(fake_wiremock.calls.values()) == 1
+    [stub] = fake_wiremock.stubs.values()
+    assert stub['response']['body'] == 'third'
+    assert outbox(db) == []
+
+def test_recent_edits_wait_for_the_debounce(db, fake_wiremock, wiremock):
+    worker = SyncWorker(db, wiremock)
+    worker.debounce = 60
+    user_id = db.create_user('outbox', 'outbox')
+    db.create_mapping(user_id, 'outbox', 'GET', '/outbox', 200, 'body')
+    
+    assert not db.has_pending_sync_changes(settled_before=time.time() - worker.debounce)
+    assert worker.run_once() == 0
+    assert fake_wiremock.stubs == {}
+    
+    assert db.has_pending_sync_changes()
+    assert worker.run_once(settle=False) == 1
+    assert len(fake_wiremock.stubs) == 1
+    assert not db.has_pending_sync_changes()
+
+def test_failed_pushes_back_off_and_keep_newer_edits(db, fake_wiremock, wiremock, monkeypatch):
+    monkeypatch.setattr(Config, 'SYNC_RETRY_BACKOFF', 10)
+    monkeypatch.setattr(Config, 'SYNC_RETRY_MAX_BACKOFF', 25)
+    worker = SyncWorker(db, wiremock)
+    user_id = db.create_user('outbox', 'outbox')
+    mapping_id = db.create_mapping(user_id, 'outbox', 'GET', '/outbox', 200, 'body')
+    
+    import_mappings = wiremock.import_mappings
+    monkeypatch.setattr(wiremock, 'import_mappings', lambda mappings, **kwargs: [
+        {'mapping_id': mapping['id'], 'name': mapping['name'], 'success': False, 'result': 'import refused'}
+        for mapping in mappings
+    ])
+    delays = []
+    for _ in range(3):
+        started = time.time()
+        assert worker.run_once(settle=False) == 1
+        [change] = outbox(db)
+        delays.append(round(change['next_attempt_at'] - started))
+        assert worker.run_once(settle=False) == 0
+        with db.get_connection() as conn:
+            conn.execute('UPDATE sync_outbox SET next_attempt_at = 0')
+    assert delays == [10, 20, 25]
+    assert (change['attempts'], change['last_error']) == (3, 'import refused')
+    assert worker.last_error == 'import refused'
+    
+    # A new edit starts the retries over
+    db.update_mapping(mapping_id, user_id, response_body='fixed')
+    [change] = outbox(db)
+    assert (change['attempts'], change['next_attempt_at'], change['last_error']) == (0, 0, None)
+    
+    monkeypatch.setattr(wiremock, 'import_mappings', import_mappings)
+    assert worker.run_once(settle=False) == 1
+    assert outbox(db) == []
+    [stub] = fake_wiremock.stubs.values()
+    assert stub['response']['body'] == 'fixed'
+
+def test_edit_toggle_and_delete_push_only_the_changed_stub(client, portal, fake_wiremock):
+    user_id = client.user_id
+    first, second = portal.db.create_mappings(user_id, [
+        {'name': name, 'request_method': 'GET', 'request_url': f'/{name}', 'response_body': name}
+        for name in ('first', 'second')
+    ])
+    portal.sync_worker.flush()
+    untouched = fake_wiremock.stubs[portal.db.get_mapping_by_id(second)['wiremock_stub_id']]
+    stub_id = portal.db.get_mapping_by_id(first)['wiremock_stub_id']
+    fake_wiremock.reset_counters()
+    
+    client.post(f'/user/mappings/{first}/edit', data={
+        'name': 'first', 'request_method': 'GET', 'request_url': '/first', 'response_body': 'edited'
+    })
+    assert portal.sync_worker.flush() == 1
+    assert fake_wiremock.stubs[stub_id]['response']['body'] == 'edited'
+    
+    client.post(f'/user/mappings/{first}/toggle')
+    assert portal.sync_worker.flush() == 1
+    assert stub_id not in fake_wiremock.stubs
+    
+    # Re-activating and then deleting coalesce into a single removal
+    client.post(f'/user/mappings/{first}/toggle')
+    client.post(f'/user/mappings/{first}/delete')
+    assert portal.sync_worker.flush() == 1
+    assert stub_id not in fake_wiremock.stubs
+    
+    # The other stub was never rewritten and WireMock was never reset
+    assert fake_wiremock.stubs == {untouched['id']: untouched}
+    assert 'POST /__admin/mappings/reset' not in fake_wiremock.calls
+    assert sum(fake_wiremock.calls.values()) == 3
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+from benchmarks.fake_wiremock import FakeWireMock
+from config import Config
+from wiremock_service import WireMockService
+
+def create_mappings(db, count, username='wiremock'):
+    user_id = db.create_user(username, username)
+    db.create_mappings(user_id, [
+        {'name': f'm{i}', 'request_method': 'GET', 'request_url': f'/{username}/{i}', 'response_body': str(i)}
+        for i in range(count)
+    ])
+    return user_id, db.get_user_mappings(user_id)
+
+def test_bulk_sync_replaces_everything_in_chunked_imports(db, fake_wiremock, wiremock):
+    fake_wiremock.stubs['stale'] = {'id': 'stale'}
+    _, mappings = create_mappings(db, 25)
+    broken = {'id': 0, 'name': 'broken'}
+    
+    results = wiremock.bulk_sync_mappings(mappings + [broken], chunk_size=10)
+    
+    assert fake_wiremock.calls == {'POST /__admin/mappings/reset': 1, 'POST /__admin/mappings/import': 3}
+    assert set(fake_wiremock.stubs) == {mapping['wiremock_stub_id'] for mapping in mappings}
+    # A mapping that cannot be built fails on its own without failing its chunk
+    assert [result['success'] for result in results] == [True] * 25 + [False]
+    assert results[-1]['result'].startswith('Error building stub')
+    
+    stub = fake_wiremock.stubs[mappings[0]['wiremock_stub_id']]
+    assert stub['response']['body'] == mappings[0]['response_body']
+    assert stub['metadata']['mockPoc'] == {'userId': mappings[0]['user_id'], 'mappingId': mappings[0]['id']}
+
+def test_calls_reuse_one_keep_alive_connection(fake_wiremock, wiremock):
+    for _ in range(20):
+        assert wiremock.test_connection()
+    [node] = wiremock.nodes
+    pool = node.session.get_adapter(node.base_url).poolmanager.connection_from_url(node.base_url)
+    assert pool.num_connections == 1
+    assert fake_wiremock.calls['GET /__admin/mappings'] == 20
+
+def test_idempotent_calls_are_retried_and_posts_are_not(fake_wiremock, monkeypatch):
+    monkeypatch.setattr(Config, 'WIREMOCK_RETRY_BACKOFF', 0)
+    wiremock = WireMockService(fake_wiremock.admin_url)
+    handle = fake_wiremock.handle
+    unavailable = []
+    def flaky(method, path, body, query=None):
+        if len(unavailable) < 2:
+            unavailable.append(method)
+            return 503, None
+        return handle(method, path, body, query)
+    monkeypatch.setattr(fake_wiremock, 'handle', flaky)
+    
+    assert wiremock.test_connection()
+    assert unavailable == ['GET', 'GET']
+    
+    del unavailable[:1]
+    success, error = wiremock.nodes[0].post_stub(b'{}')
+    assert not success and '503' in error
+    assert unavailable == ['GET', 'POST']
+
+def test_hung_node_times_out(fake_wiremock, monkeypatch):
+    monkeypatch.setattr(Config, 'WIREMOCK_READ_TIMEOUT', 0.2)
+    monkeypatch.setattr(Config, 'WIREMOCK_MAX_RETRIES', 0)
+    wiremock = WireMockService(fake_wiremock.admin_url)
+    fake_wiremock.latency = 2
+    
+    started = time.monotonic()
+    assert not wiremock.test_connection()
+    assert time.monotonic() - started < 1
+
+@pytest.fixture
+def fake_nodes():
+    fakes = [FakeWireMock().start() for _ in range(3)]
+    yield fakes
+    for fake in fakes:
+        fake.stop()
+
+def test_replicas_are_pushed_concurrently(db, fake_nodes):
+    wiremock = WireMockService(base_urls=[fake.admin_url for fake in fake_nodes], sharding='replicate')
+    _, mappings = create_mappings(db, 5)
+    for fake in fake_nodes:
+        fake.latency = 0.3
+    
+    started = time.monotonic()
+    results = wiremock.import_mappings(mappings)
+    assert time.monotonic() - started < 0.6
+    assert all(result['success'] for result in results)
+    assert fake_nodes[0].stubs == fake_nodes[1].stubs == fake_nodes[2].stubs
+    assert len(fake_nodes[0].stubs) == 5
+
+@pytest.mark.parametrize('sharding, key', [
+    ('url_prefix', lambda mapping: mapping['request_url'].split('/')[1]),
+    ('owner', lambda mapping: mapping['user_id']),
+])
+def test_shards_keep_related_stubs_on_one_node(db, fake_nodes, sharding, key):
+    wiremock = WireMockService(base_urls=[fake.admin_url for fake in fake_nodes], sharding=sharding)
+    mappings = [mapping for i in range(6) for mapping in create_mappings(db, 4, username=f'team{i}')[1]]
+    assert all(result['success'] for result in wiremock.import_mappings(mappings))
+    
+    placed = {}
+    for mapping in mappings:
+        [node] = [i for i, fake in enumerate(fake_nodes) if mapping['wiremock_stub_id'] in fake.stubs]
+        placed.setdefault(key(mapping), set()).add(node)
+    assert all(len(nodes) == 1 for nodes in placed.values())
+    assert sum(len(fake.stubs) for fake in fake_nodes) == len(mappings)
+    assert len(set.union(*placed.values())) > 1
+
+def test_a_failed_shard_fails_only_its_own_mappings(db, fake_nodes, monkeypatch):
+    monkeypatch.setattr(Config, 'WIREMOCK_RETRY_BACKOFF', 0)
+    wiremock = WireMockService(base_urls=[fake.admin_url for fake in fake_nodes], sharding='owner')
+    mappings = [mapping for i in range(6) for mapping in create_mappings(db, 2, username=f'team{i}')[1]]
+    fake_nodes[1].stop()
+    
+    results = wiremock.import_mappings(mappings)
+    down = wiremock.nodes[1]
+    assert [result['success'] for result in results] == [wiremock.nodes_for(m) != [down] for m in mappings]
+    assert not all(result['success'] for result in results)
+    assert down.status['last_sync_ok'] is False
@@ -1,57 +1,547 @@
 import requests
+import hashlib
 import json
+import os
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cache import LRUCache
 from config import Config
+from metrics import WIREMOCK_REQUEST_DURATION, WIREMOCK_RETRIES, WIREMOCK_FULL_SYNC_DURATION
 
-class WireMockService:
-    def __init__(self, base_url=None):
-        self.base_url = base_url or Config.WIREMOCK_ADMIN_API
+# Stub ids and request ids in admin API paths, collapsed so metric label values stay bounded
+ID_SEGMENT = re.compile(r'/(?:[0-9a-fA-F-]{32,36}|\d+)(?=/|$)')
+JSON_HEADERS = {'Content-Type': 'application/json'}
+IMPORT_OPTIONS = b'"importOptions":{"duplicatePolicy":"OVERWRITE","deleteAllNotInImport":false}'
+
+class CompiledStub(bytes):
+    """Serialized stub JSON, tagged with the mapping version it was built from"""
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a WireMock node whose circuit is open"""
+
+class CircuitBreaker:
+    """Stops calls to a failing node until it has had time to recover.
     
-    def sync_mapping(self, mapping):
-        """Sync a single mapping to WireMock"""
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail at once instead of each waiting out a connection attempt. Once
+    reset_timeout has passed a single trial call is let through, and its
+    outcome closes the circuit again or restarts the wait.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+    
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+    
+    @property
+    def blocked(self):
+        """True while calls would be refused, without claiming the trial call"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            return self.state == self.HALF_OPEN or time.monotonic() - self.opened_at < self.reset_timeout
+    
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+    
+    def trip(self):
+        """Open the circuit now, e.g. after a failed health probe"""
+        with self._lock:
+            self._open()
+    
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+
+class WireMockNode:
+    """Admin API client for a single WireMock instance"""
+    
+    # Only calls that are safe to repeat are retried automatically
+    IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE'])
+    
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.timeout = (Config.WIREMOCK_CONNECT_TIMEOUT, Config.WIREMOCK_READ_TIMEOUT)
+        self.session = self._create_session()
+        self._session_pid = os.getpid()
+        self.breaker = CircuitBreaker(Config.CIRCUIT_FAILURE_THRESHOLD, Config.CIRCUIT_RESET_SECONDS)
+        self.status = {
+            'url': base_url,
+            'last_sync_ok': None,
+            'last_sync_at': None,
+            'last_error': None
+        }
+    
+    def _create_session(self):
+        retry = Retry(
+            total=Config.WIREMOCK_MAX_RETRIES,
+            backoff_factor=Config.WIREMOCK_RETRY_BACKOFF,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=self.IDEMPOTENT_METHODS,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=Config.WIREMOCK_POOL_SIZE,
+            pool_maxsize=Config.WIREMOCK_POOL_SIZE,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def _request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        path_label = ID_SEGMENT.sub('/{id}', path)
+        status = 'error'
+        # Pooled sockets must not cross a fork, so a child process opens its own
+        if self._session_pid != os.getpid():
+            self.session = self._create_session()
+            self._session_pid = os.getpid()
+        # A node known to be down fails at once rather than after its timeouts
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.base_url} is unavailable (circuit open)")
+        start = time.perf_counter()
         try:
-            # Parse response headers if stored as JSON string
-            headers = {}
-            if mapping['response_headers']:
-                try:
-                    headers = json.loads(mapping['response_headers'])
-                except:
-                    pass
-            
-            # Build WireMock stub mapping
-            stub = {
-                "request": {
-                    "method": mapping['request_method'],
-                    "urlPath": mapping['request_url']
-                },
-                "response": {
-                    "status": mapping['response_status'],
-                    "body": mapping['response_body'] or "",
-                    "headers": headers
-                },
-                "priority": mapping['priority']
-            }
-            
-            # Send to WireMock
-            response = requests.post(
-                f"{self.base_url}/mappings",
-                json=stub,
-                headers={'Content-Type': 'application/json'}
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+            except requests.RequestException:
+                self.breaker.record_failure()
+                raise
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            status = str(response.status_code)
+            retries = getattr(response.raw, 'retries', None)
+            if retries and retries.history:
+                WIREMOCK_RETRIES.inc(len(retries.history), node=self.base_url, method=method, path=path_label)
+            return response
+        finally:
+            WIREMOCK_REQUEST_DURATION.observe(
+                time.perf_counter() - start, node=self.base_url, method=method, path=path_label, status=status
             )
+    
+    def _record(self, success, result=None):
+        """Remember the outcome of the last write for the dashboard"""
+        self.status.update({
+            'last_sync_ok': success,
+            'last_sync_at': time.time(),
+            'last_error': None if success else result
+        })
+        return success, result
+    
+    def post_stub(self, stub):
+        try:
+            response = self._request('POST', '/mappings', data=stub, headers=JSON_HEADERS)
             
             if response.status_code in [200, 201]:
-                return True, response.json()
+                return self._record(True, response.json())
+            else:
+                return self._record(False, f"WireMock error: {response.status_code} - {response.text}")
+        except Exception as e:
+            return self._record(False, f"Error syncing to WireMock: {str(e)}")
+    
+    def put_stub(self, stub_id, stub):
+        try:
+            response = self._request('PUT', f"/mappings/{stub_id}", data=stub, headers=JSON_HEADERS)
+            
+            # The stub is gone (e.g. WireMock restarted), so create it again
+            if response.status_code == 404:
+                return self.post_stub(stub)
+            
+            if response.status_code == 200:
+                return self._record(True, response.json())
+            else:
+                return self._record(False, f"WireMock error: {response.status_code} - {response.text}")
+        except Exception as e:
+            return self._record(False, f"Error syncing to WireMock: {str(e)}")
+    
+    def delete_stub(self, stub_id):
+        try:
+            response = self._request('DELETE', f"/mappings/{stub_id}")
+            
+            # A stub that is already gone needs no removal
+            if response.status_code in [200, 404]:
+                return self._record(True)
+            else:
+                return self._record(False, f"WireMock error: {response.status_code} - {response.text}")
+        except Exception as e:
+            return self._record(False, f"Error removing stub from WireMock: {str(e)}")
+    
+    def import_stubs(self, stubs):
+        """Bulk import already serialized stubs"""
+        try:
+            # The stubs are spliced in as-is instead of being parsed and re-encoded
+            body = b'{"mappings":[' + b','.join(stubs) + b'],' + IMPORT_OPTIONS + b'}'
+            response = self._request('POST', '/mappings/import', data=body, headers=JSON_HEADERS)
+            
+            if response.status_code == 200:
+                return self._record(True)
+            else:
+                return self._record(False, f"WireMock error: {response.status_code} - {response.text}")
+        except Exception as e:
+            return self._record(False, f"Error importing to WireMock: {str(e)}")
+    
+    def get_all_stubs(self):
+        try:
+            response = self._request('GET', '/mappings')
+            if response.status_code == 200:
+                return True, response.json().get('mappings', [])
+            else:
+                return False, f"WireMock error: {response.status_code} - {response.text}"
+        except Exception as e:
+            return False, f"Error fetching stubs from WireMock: {str(e)}"
+    
+    def find_stubs_by_metadata(self, pattern):
+        """Stubs whose metadata matches a WireMock content pattern"""
+        try:
+            response = self._request('POST', '/mappings/find-by-metadata', json=pattern)
+            if response.status_code == 200:
+                return True, response.json().get('mappings', [])
             else:
                 return False, f"WireMock error: {response.status_code} - {response.text}"
+        except Exception as e:
+            return False, f"Error fetching stubs from WireMock: {str(e)}"
+    
+    def remove_stubs_by_metadata(self, pattern):
+        try:
+            response = self._request('POST', '/mappings/remove-by-metadata', json=pattern)
+            if response.status_code == 200:
+                return self._record(True)
+            else:
+                return self._record(False, f"WireMock error: {response.status_code} - {response.text}")
+        except Exception as e:
+            return self._record(False, f"Error removing stubs from WireMock: {str(e)}")
+    
+    def get_requests(self, since=None, limit=None):
+        """Page of the request journal, newest first"""
+        params = {}
+        if since:
+            params['since'] = since
+        if limit:
+            params['limit'] = limit
+        try:
+            response = self._request('GET', '/requests', params=params)
+            if response.status_code == 200:
+                return True, response.json().get('requests', [])
+            else:
+                return False, f"WireMock error: {response.status_code} - {response.text}"
+        except Exception as e:
+            return False, f"Error fetching request journal: {str(e)}"
+    
+    def remove_requests(self, pattern):
+        """Remove every journal entry matching a request pattern, returning the removed entries"""
+        try:
+            response = self._request('POST', '/requests/remove', json=pattern)
+            if response.status_code == 200:
+                return True, response.json().get('serveEvents', [])
+            else:
+                return False, f"WireMock error: {response.status_code} - {response.text}"
+        except Exception as e:
+            return False, f"Error trimming request journal: {str(e)}"
+    
+    def reset(self):
+        try:
+            response = self._request('POST', '/mappings/reset')
+            if response.status_code == 200:
+                return self._record(True)
+            else:
+                return self._record(False, f"WireMock error: {response.status_code} - {response.text}")
+        except Exception as e:
+            return self._record(False, f"Error resetting WireMock: {str(e)}")
+    
+    def test_connection(self):
+        try:
+            response = self._request('GET', '/mappings', params={'limit': 1})
+            return response.status_code == 200
+        except:
+            return False
+    
+    def probe(self, timeout):
+        """Health check that bypasses the circuit and drives it, returning (online, seconds, error)"""
+        start = time.perf_counter()
+        try:
+            # A plain one-off request: no automatic retries and no pooled socket to go stale
+            response = requests.get(f"{self.base_url}/mappings", params={'limit': 1}, timeout=timeout)
+            online = response.status_code == 200
+            error = None if online else f"WireMock error: {response.status_code}"
+        except requests.RequestException as e:
+            online, error = False, f"Error connecting to WireMock: {str(e)}"
+        
+        if online:
+            self.breaker.record_success()
+        else:
+            self.breaker.trip()
+        return online, time.perf_counter() - start, error
+
+class WireMockService:
+    # Stub metadata key for the data this app attaches to its stubs
+    METADATA_KEY = 'mockPoc'
+    SHARDING_MODES = ('replicate', 'url_prefix', 'owner')
+    
+    def __init__(self, base_url=None, base_urls=None, sharding=None):
+        urls = base_urls or ([base_url] if base_url else Config.WIREMOCK_ADMIN_APIS)
+        self.nodes = [WireMockNode(url) for url in urls]
+        self.sharding = sharding or Config.WIREMOCK_SHARDING
+        if self.sharding not in self.SHARDING_MODES:
+            raise ValueError(f"Unknown WireMock sharding mode: {self.sharding}")
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+        self._compiled = LRUCache(Config.STUB_CACHE_SIZE, maxbytes=Config.STUB_CACHE_MAX_BYTES)
+    
+    @property
+    def base_url(self):
+        return self.nodes[0].base_url
+    
+    @base_url.setter
+    def base_url(self, value):
+        self.nodes[0].base_url = value
+    
+    def _fan_out(self, nodes, call):
+        """Run call(node) on every node concurrently, returning results in node order"""
+        if len(nodes) == 1:
+            return [call(nodes[0])]
+        
+        # One bounded pool shared by all calls, so adding nodes costs no more threads
+        # Pool threads do not survive a fork, so a child process starts its own pool
+        with self._executor_lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=Config.WIREMOCK_FANOUT_WORKERS,
+                    thread_name_prefix='wiremock-fanout'
+                )
+                self._executor_pid = os.getpid()
+        return list(self._executor.map(call, nodes))
+    
+    @staticmethod
+    def _combine(outcomes):
+        errors = [str(result) for success, result in outcomes if not success]
+        if errors:
+            return False, '; '.join(errors)
+        return True, outcomes[0][1]
+    
+    def nodes_for(self, mapping):
+        """Nodes that should serve a mapping's stub"""
+        if self.sharding == 'replicate' or len(self.nodes) == 1:
+            return self.nodes
+        
+        if self.sharding == 'owner':
+            key = str(mapping['user_id'])
+        else:
+            # Shard on the first path segment so an API's endpoints stay together
+            key = mapping['request_url'].lstrip('/').split('/', 1)[0]
+        return [self.nodes[zlib.crc32(key.encode('utf-8')) % len(self.nodes)]]
+    
+    # Stub fields the fingerprint covers; anything else on a fetched stub counts as drift
+    FINGERPRINT_REQUEST_FIELDS = {'method', 'urlPath'}
+    FINGERPRINT_RESPONSE_FIELDS = {'status', 'body', 'jsonBody', 'bodyFileName', 'headers'}
+    
+    @staticmethod
+    def _parse_headers(raw):
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError:
+            return {}
+    
+    @staticmethod
+    def _fingerprint(method, url, status, body_hash, headers, priority, extra=None):
+        content = json.dumps(
+            [method, url, status, body_hash, headers or {}, priority, extra or {}],
+            separators=(',', ':'), sort_keys=True
+        )
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    
+    @classmethod
+    def stub_fingerprint(cls, mapping):
+        """Fingerprint of everything that goes into a mapping's stub"""
+        # The body is represented by its SHA-256, as stored in response_blobs,
+        # so fingerprints can be computed without loading any bodies
+        body_hash = mapping.get('response_body_hash')
+        if body_hash is None and mapping.get('response_body'):
+            body_hash = hashlib.sha256(mapping['response_body'].encode('utf-8')).hexdigest()
+        return cls._fingerprint(
+            mapping['request_method'], mapping['request_url'], mapping['response_status'],
+            body_hash, cls._parse_headers(mapping['response_headers']), mapping['priority']
+        )
+    
+    @classmethod
+    def remote_fingerprint(cls, stub):
+        """Fingerprint recomputed from the request and response of a stub fetched from WireMock.
+        
+        Matches stub_fingerprint() of the mapping the stub was built from for
+        as long as nobody changes the stub inside WireMock.
+        """
+        request = stub.get('request') or {}
+        response = stub.get('response') or {}
+        if response.get('bodyFileName') is not None:
+            # Exported stubs name their content-addressed body file by its hash
+            body_hash = response['bodyFileName']
+        elif response.get('jsonBody') is not None:
+            body_hash = hashlib.sha256(json.dumps(response['jsonBody']).encode('utf-8')).hexdigest()
+        elif response.get('body'):
+            body_hash = hashlib.sha256(response['body'].encode('utf-8')).hexdigest()
+        else:
+            body_hash = None
+        extra = {
+            **{f'request.{key}': value for key, value in request.items()
+               if key not in cls.FINGERPRINT_REQUEST_FIELDS},
+            **{f'response.{key}': value for key, value in response.items()
+               if key not in cls.FINGERPRINT_RESPONSE_FIELDS}
+        }
+        return cls._fingerprint(
+            request.get('method'), request.get('urlPath'), response.get('status'),
+            body_hash, response.get('headers'), stub.get('priority'), extra
+        )
+    
+    def build_stub(self, mapping):
+        """Build the WireMock stub definition for a mapping"""
+        # Parse response headers if stored as JSON string
+        headers = self._parse_headers(mapping['response_headers'])
+        
+        # Build WireMock stub mapping
+        stub = {
+            "request": {
+                "method": mapping['request_method'],
+                "urlPath": mapping['request_url']
+            },
+            "response": {
+                "status": mapping['response_status'],
+                "body": mapping['response_body'] or "",
+                "headers": headers
+            },
+            "priority": mapping['priority'],
+            "metadata": {
+                self.METADATA_KEY: {}
+            }
+        }
+        
+        # Owner and mapping tags let one user's stubs be found and replaced
+        # without touching anyone else's
+        if mapping.get('user_id') is not None:
+            stub["metadata"][self.METADATA_KEY]["userId"] = mapping['user_id']
+        if mapping.get('id') is not None:
+            stub["metadata"][self.METADATA_KEY]["mappingId"] = mapping['id']
+        
+        # Pin the stub to the UUID stored on the mapping so later edits and
+        # deletes can address it directly instead of resetting everything
+        if mapping.get('wiremock_stub_id'):
+            stub["id"] = mapping['wiremock_stub_id']
+        
+        return stub
+    
+    @staticmethod
+    def _stub_version(mapping):
+        # updated_at only has second precision, so the fields the stub is built
+        # from are compared too; the body by hash when it has one
+        return (
+            mapping.get('updated_at'), mapping['request_method'], mapping['request_url'],
+            mapping['response_status'], mapping.get('response_body_hash') or mapping['response_body'],
+            mapping['response_headers'], mapping['priority'], mapping.get('wiremock_stub_id')
+        )
+    
+    def compile_stub(self, mapping):
+        """Serialized stub for a mapping, reused until the mapping changes"""
+        version = self._stub_version(mapping)
+        marker = self._compiled.marker()
+        stub = self._compiled.get(mapping['id'])
+        if stub is not None and stub.version == version:
+            return stub
+        
+        stub = CompiledStub(json.dumps(self.build_stub(mapping), separators=(',', ':')).encode('utf-8'))
+        stub.version = version
+        self._compiled.set(mapping['id'], stub, marker)
+        return stub
+    
+    def invalidate_stubs(self, mapping_ids):
+        """Drop compiled stubs of changed mappings; registered as a mapping listener"""
+        for mapping_id in mapping_ids:
+            self._compiled.invalidate(mapping_id)
+    
+    def stub_cache_stats(self):
+        return self._compiled.stats()
+    
+    def sync_mapping(self, mapping):
+        """Sync a single mapping to WireMock"""
+        try:
+            stub = self.compile_stub(mapping)
+        except Exception as e:
+            return False, f"Error syncing to WireMock: {str(e)}"
+        
+        return self._combine(self._fan_out(self.nodes_for(mapping), lambda node: node.post_stub(stub)))
+    
+    def update_mapping_stub(self, mapping):
+        """Replace the WireMock stub of an edited mapping in place"""
+        stub_id = mapping.get('wiremock_stub_id')
+        if not stub_id:
+            return self.sync_mapping(mapping)
+        
+        try:
+            stub = self.compile_stub(mapping)
         except Exception as e:
             return False, f"Error syncing to WireMock: {str(e)}"
+        
+        return self._combine(self._fan_out(
+            self.nodes_for(mapping), lambda node: node.put_stub(stub_id, stub)
+        ))
+    
+    def remove_mapping_stub(self, stub_id, nodes=None):
+        """Remove a single stub from WireMock"""
+        if not stub_id:
+            return True, None
+        
+        # Which shard a deleted mapping lived on is not known, so ask every node
+        return self._combine(self._fan_out(nodes or self.nodes, lambda node: node.delete_stub(stub_id)))
+    
+    def remove_mapping_stubs(self, stub_ids):
+        """Remove many stubs from every node, returning {stub_id: (success, error)}"""
+        stub_ids = [stub_id for stub_id in stub_ids if stub_id]
+        if not stub_ids:
+            return {}
+        
+        # Nodes work through the list concurrently, each over its own keep-alive connection
+        per_node = self._fan_out(
+            self.nodes, lambda node: [node.delete_stub(stub_id) for stub_id in stub_ids]
+        )
+        return {
+            stub_id: self._combine([outcomes[i] for outcomes in per_node])
+            for i, stub_id in enumerate(stub_ids)
+        }
     
     def sync_all_mappings(self, mappings):
         """Sync all active mappings to WireMock"""
         # First, reset all mappings
-        try:
-            requests.post(f"{self.base_url}/mappings/reset")
-        except:
-            pass
+        self.delete_all_mappings()
         
         results = []
         for mapping in mappings:
@@ -65,18 +555,103 @@ class WireMockService:
         
         return results
     
+    def import_mappings(self, mappings, chunk_size=None, nodes=None, fence=None):
+        """Push mappings in chunked calls to WireMock's bulk import endpoint.
+        
+        fence, if given, is called before every chunk and raises to abort the
+        push when this process may no longer write to WireMock.
+        """
+        chunk_size = chunk_size or Config.WIREMOCK_IMPORT_CHUNK_SIZE
+        targets = nodes or self.nodes
+        
+        # Build every stub up front so a malformed mapping fails on its own
+        # instead of taking its whole chunk down with it
+        results = []
+        pending = {node: [] for node in targets}
+        for mapping in mappings:
+            result = {
+                'mapping_id': mapping['id'],
+                'name': mapping['name'],
+                'success': False,
+                'result': None
+            }
+            results.append(result)
+            try:
+                stub = self.compile_stub(mapping)
+            except Exception as e:
+                result['result'] = f"Error building stub: {str(e)}"
+                continue
+            
+            result['success'] = True
+            for node in self.nodes_for(mapping):
+                if node in pending:
+                    pending[node].append((result, stub))
+        
+        # Nodes are pushed concurrently; a chunk failing on any node fails its mappings
+        def push(node):
+            for start in range(0, len(pending[node]), chunk_size):
+                chunk = pending[node][start:start + chunk_size]
+                if fence:
+                    fence()
+                success, error = node.import_stubs([stub for _, stub in chunk])
+                if not success:
+                    for result, _ in chunk:
+                        result['success'] = False
+                        result['result'] = error
+        
+        busy = [node for node in targets if pending[node]]
+        if busy:
+            self._fan_out(busy, push)
+        
+        return results
+    
+    def bulk_sync_mappings(self, mappings, chunk_size=None, fence=None):
+        """Replace everything in WireMock with the given mappings using bulk imports"""
+        start = time.perf_counter()
+        if fence:
+            fence()
+        if not self.delete_all_mappings():
+            return [{
+                'mapping_id': mapping['id'],
+                'name': mapping['name'],
+                'success': False,
+                'result': 'Error resetting WireMock mappings'
+            } for mapping in mappings]
+        
+        results = self.import_mappings(mappings, chunk_size, fence=fence)
+        WIREMOCK_FULL_SYNC_DURATION.set(time.perf_counter() - start)
+        return results
+    
+    def get_all_stubs(self, node=None):
+        """Fetch every stub currently loaded in WireMock"""
+        return (node or self.nodes[0]).get_all_stubs()
+    
+    @classmethod
+    def owner_pattern(cls, user_id):
+        """Metadata pattern matching the stubs of one user"""
+        return {'matchesJsonPath': {'expression': f'$.{cls.METADATA_KEY}.userId', 'equalTo': str(user_id)}}
+    
+    def find_user_stubs(self, user_id, node=None):
+        """Fetch only the stubs tagged with a user's id"""
+        return (node or self.nodes[0]).find_stubs_by_metadata(self.owner_pattern(user_id))
+    
+    def remove_user_stubs(self, user_id, nodes=None):
+        """Remove every stub tagged with a user's id in one call per node"""
+        pattern = self.owner_pattern(user_id)
+        return self._combine(self._fan_out(nodes or self.nodes, lambda node: node.remove_stubs_by_metadata(pattern)))
+    
     def delete_all_mappings(self):
         """Delete all mappings from WireMock"""
-        try:
-            response = requests.post(f"{self.base_url}/mappings/reset")
-            return response.status_code == 200
-        except Exception as e:
-            return False
+        return all(success for success, _ in self._fan_out(self.nodes, lambda node: node.reset()))
     
     def test_connection(self):
         """Test WireMock connection"""
-        try:
-            response = requests.get(f"{self.base_url}/mappings")
-            return response.status_code == 200
-        except:
-            return False
+        return all(self._fan_out(self.nodes, lambda node: node.test_connection()))
+    
+    def probe_nodes(self, timeout):
+        """Probe every node concurrently, returning (online, seconds, error) per node"""
+        return self._fan_out(self.nodes, lambda node: node.probe(timeout))
+    
+    def available(self):
+        """False while every node's circuit is open, so syncing now could only fail"""
+        return not all(node.breaker.blocked for node in self.nodes)